@@ -0,0 +1,400 @@
+from db import get_async_db
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dates import PUBLISHED_AT_FIELD, with_published_at
+from feed import INGESTED_AT_FIELD, stamp_ingested
+from cache import response_cache
+from responses import ndjson_chunk
+from stats import (
+    PROFILES_COLLECTION, ROLLUP_COLLECTION, EMPTY_BUCKETS, rollup_ops, article_dates_query, set_article_dates,
+    facets_pipeline, facets_response, timeseries_pipeline, timeseries_response
+)
+from suggest import DEFAULT_SUGGEST_LIMIT, company_names
+from url_registry import KNOWN_URLS_COLLECTION, EMPTY_SOURCES, add_source, remove_source, url_domain
+from versions import VERSIONS_COLLECTION, bump_op
+import asyncio
+
+from crud import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EXPORT_BATCH_SIZE, EXPORT_CHUNK_DOCS,
+    BULK_COLLECTIONS, BULK_BATCH_SIZE, build_bulk_ops, bulk_item_results, bulk_changes, bulk_before_query,
+    COMPANY_NAME_COUNTS_PIPELINE
+)
+from search import (
+    SEARCH_FIELDS, URL_FIELDS, DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE, DEFAULT_COLLECTION_LIMIT, MAX_COLLECTION_LIMIT,
+    DEFAULT_TOTAL_LIMIT, MAX_TOTAL_LIMIT, check_page, text_query, search_order, search_projection, search_sort, search_terms, merge_results, highlight
+)
+
+# Async mirror of crud.py for the FastAPI app. Function names and return
+# values match crud.py; every function is a coroutine (or async generator).
+
+def _collection(name):
+    return get_async_db()[name]
+
+async def _written(name, removed=(), added=()):
+    """Keep derived state in step after a write to collection `name`.
+
+    `removed` are the documents as they were before the write (deleted or
+    pre-update), `added` as they are after it (inserted or post-update).
+    """
+    response_cache.invalidate(name)
+    await _collection(VERSIONS_COLLECTION).update_one(*bump_op(name), upsert=True)
+    if name == PROFILES_COLLECTION:
+        await _apply_rollup(removed, added)
+    if name == "companies":
+        company_names.apply(removed, added)
+    if name not in URL_FIELDS:
+        return
+    field = URL_FIELDS[name]
+    old_urls = {doc.get(field) for doc in removed} - {None, ""}
+    new_urls = {doc.get(field) for doc in added} - {None, ""}
+    for url in old_urls - new_urls:
+        await _unregister_url(name, url)
+    await _register_urls(name, new_urls - old_urls)
+
+async def _apply_rollup(removed, added):
+    ops = rollup_ops(removed, added)
+    if ops:
+        rollup = _collection(ROLLUP_COLLECTION)
+        await rollup.bulk_write(ops, ordered=False)
+        if removed:
+            await rollup.delete_many(EMPTY_BUCKETS)
+
+async def _register_urls(name, urls):
+    if urls:
+        ops = [UpdateOne(*add_source(name, url), upsert=True) for url in urls]
+        await _collection(KNOWN_URLS_COLLECTION).bulk_write(ops, ordered=False)
+
+async def _unregister_url(name, url):
+    """Drop `name` from the URL's sources unless another document in that collection still has it."""
+    if await _collection(name).count_documents({URL_FIELDS[name]: url}, limit=1):
+        return
+    known = _collection(KNOWN_URLS_COLLECTION)
+    await known.update_one(*remove_source(name, url))
+    await known.delete_one({"_id": url, **EMPTY_SOURCES})
+
+# ---------- Pagination ----------
+async def paginate(collection, query=None, limit=DEFAULT_PAGE_SIZE, after=None, projection=None, cursor_type=ObjectId):
+    """Return one keyset page of documents ordered by _id, plus the cursor for the next page.
+
+    `cursor_type` converts `after` back to an _id value; with the default ObjectId
+    this raises bson.errors.InvalidId for a malformed cursor.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = dict(query or {})
+    if after:
+        query["_id"] = {"$gt": cursor_type(after)}
+    # Fetch one extra document to know whether another page exists
+    docs = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(length=None)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["_id"])
+    return docs, next_cursor
+
+# ---------- Articles CRUD ----------
+async def create_article(data):
+    """Insert a new article."""
+    with_published_at("articles", data)
+    stamp_ingested("articles", data)
+    result = await _collection("articles").insert_one(data)
+    await _written("articles", added=[data])
+    return str(result.inserted_id)
+
+async def get_article(article_id):
+    """Get a single article by ID."""
+    return await _collection("articles").find_one({"_id": ObjectId(article_id)})
+
+async def get_all_articles(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of articles."""
+    return await paginate(_collection("articles"), limit=limit, after=after)
+
+async def get_articles_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of articles matching the given company name."""
+    return await paginate(_collection("articles"), {"Empresa": empresa}, limit, after)
+
+async def update_article(article_id, data):
+    """Update an article by ID."""
+    with_published_at("articles", data)
+    stamp_ingested("articles", data)
+    old = await _collection("articles").find_one_and_update({"_id": ObjectId(article_id)}, {"$set": data})
+    if not old:
+        return 0
+    await _written("articles", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items() if k != INGESTED_AT_FIELD))
+
+async def delete_article(article_id):
+    """Delete an article by ID."""
+    doc = await _collection("articles").find_one_and_delete({"_id": ObjectId(article_id)})
+    if not doc:
+        return 0
+    await _written("articles", removed=[doc])
+    return 1
+
+# ---------- Media Reports CRUD ----------
+async def create_media_report(data):
+    """Insert a new media report."""
+    with_published_at("media_reports", data)
+    stamp_ingested("media_reports", data)
+    result = await _collection("media_reports").insert_one(data)
+    await _written("media_reports", added=[data])
+    return str(result.inserted_id)
+
+async def get_media_report(report_id):
+    """Get a single media report by ID."""
+    return await _collection("media_reports").find_one({"_id": ObjectId(report_id)})
+
+async def get_all_media_reports(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of media reports."""
+    return await paginate(_collection("media_reports"), limit=limit, after=after)
+
+async def get_media_reports_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of media reports matching the given company name."""
+    return await paginate(_collection("media_reports"), {"Empresa": empresa}, limit, after)
+
+async def update_media_report(report_id, data):
+    """Update a media report by ID."""
+    with_published_at("media_reports", data)
+    stamp_ingested("media_reports", data)
+    old = await _collection("media_reports").find_one_and_update({"_id": ObjectId(report_id)}, {"$set": data})
+    if not old:
+        return 0
+    await _written("media_reports", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items() if k != INGESTED_AT_FIELD))
+
+async def delete_media_report(report_id):
+    """Delete a media report by ID."""
+    doc = await _collection("media_reports").find_one_and_delete({"_id": ObjectId(report_id)})
+    if not doc:
+        return 0
+    await _written("media_reports", removed=[doc])
+    return 1
+
+# ---------- Companies CRUD ----------
+async def create_company(data):
+    """Insert a new company."""
+    with_published_at("companies", data)
+    result = await _collection("companies").insert_one(data)
+    await _written("companies", added=[data])
+    return str(result.inserted_id)
+
+async def get_company(company_id):
+    """Get a single company by ID."""
+    return await _collection("companies").find_one({"_id": ObjectId(company_id)})
+
+async def get_all_companies(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of companies."""
+    return await paginate(_collection("companies"), limit=limit, after=after)
+
+async def get_companies_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of companies matching the given company name."""
+    return await paginate(_collection("companies"), {"Empresa protagonista (Nombre)": empresa}, limit, after)
+
+async def update_company(company_id, data):
+    """Update a company by ID."""
+    with_published_at("companies", data)
+    old = await _collection("companies").find_one_and_update({"_id": ObjectId(company_id)}, {"$set": data})
+    if not old:
+        return 0
+    await _written("companies", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items()))
+
+async def delete_company(company_id):
+    """Delete a company by ID."""
+    doc = await _collection("companies").find_one_and_delete({"_id": ObjectId(company_id)})
+    if not doc:
+        return 0
+    await _written("companies", removed=[doc])
+    return 1
+
+
+# ---------- Company Name Suggestions ----------
+_company_names_lock = asyncio.Lock()
+_company_names_refresh = None
+
+async def _load_company_names():
+    company_names.begin_build()  # writes from here on are replayed onto the new index
+    result = await (await _collection("companies").aggregate(COMPANY_NAME_COUNTS_PIPELINE)).to_list(length=None)
+    # Sorting 100k names takes a while; keep it off the event loop
+    await asyncio.to_thread(company_names.build, [(c["_id"], c["count"]) for c in result])
+
+async def suggest_companies(q, limit=DEFAULT_SUGGEST_LIMIT):
+    """Company names starting with `q` (or with a word that does), ignoring case and accents."""
+    global _company_names_refresh
+    if company_names.built_at is None:
+        async with _company_names_lock:  # concurrent first requests share one load
+            if company_names.built_at is None:
+                await _load_company_names()
+    elif company_names.is_stale() and (_company_names_refresh is None or _company_names_refresh.done()):
+        # Serve the current index while a fresh one is built
+        _company_names_refresh = asyncio.create_task(_load_company_names())
+    return company_names.suggest(q, limit)
+
+# ---------- Bulk Writes ----------
+async def bulk_write_documents(name, docs, upsert=False, offset=0):
+    """Write a batch of documents with one unordered bulk_write and return a result per item.
+
+    With upsert, documents are matched on the collection's BULK_KEY_FIELDS
+    field and $set over any existing document instead of inserted.
+    """
+    if name == PROFILES_COLLECTION:
+        query = article_dates_query(docs)
+        if query:
+            articles = await _collection("articles").find(query, {"URL": 1, PUBLISHED_AT_FIELD: 1}).to_list(length=None)
+            set_article_dates(docs, articles)
+    ops, op_items, results = build_bulk_ops(name, docs, upsert, offset)
+    before_query = bulk_before_query(name, op_items, upsert)
+    before = await _collection(name).find(before_query).to_list(length=None) if before_query else []
+    upserted_ids, write_errors = {}, {}
+    if ops:
+        try:
+            upserted_ids = (await _collection(name).bulk_write(ops, ordered=False)).upserted_ids
+        except BulkWriteError as e:
+            upserted_ids = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            write_errors = {err["index"]: err["errmsg"] for err in e.details.get("writeErrors", [])}
+    item_results = bulk_item_results(op_items, upsert, upserted_ids, write_errors)
+    removed, added = bulk_changes(name, op_items, item_results, before, upsert)
+    if added:
+        await _written(name, removed=removed, added=added)
+    return sorted(results + item_results, key=lambda r: r["index"])
+
+
+async def _search_collection(name, keyword, date_from, date_to, sort, limit):
+    cursor = (
+        _collection(name)
+        .find(text_query(name, keyword, date_from, date_to), search_projection(keyword))
+        .sort(search_sort(name, sort))
+        .limit(limit)
+    )
+    docs = await cursor.to_list(length=None)
+    for doc in docs:
+        doc["collection"] = name
+    return docs
+
+async def search_merged(keyword, date_from=None, date_to=None, sort="score",
+                        limit=DEFAULT_TOTAL_LIMIT, per_collection_limit=DEFAULT_COLLECTION_LIMIT):
+    """Query all searchable collections concurrently and return one merged, deduplicated hit list.
+
+    A blank keyword lists the documents in the date range, newest first.
+    """
+    keyword = (keyword or "").strip()
+    sort = search_order(keyword, sort)
+    limit = max(1, min(limit, MAX_TOTAL_LIMIT))
+    per_collection_limit = max(1, min(per_collection_limit, MAX_COLLECTION_LIMIT, limit))
+    result_lists = await asyncio.gather(*(
+        _search_collection(name, keyword, date_from, date_to, sort, per_collection_limit)
+        for name in SEARCH_FIELDS
+    ))
+    return merge_results(result_lists, sort, limit)
+
+async def search_all_collections(keyword, date_from=None, date_to=None, page=1, page_size=DEFAULT_SEARCH_PAGE_SIZE,
+                                 sort="score", limit=DEFAULT_TOTAL_LIMIT, per_collection_limit=DEFAULT_COLLECTION_LIMIT):
+    """Full-text search of articles, companies and media_reports, returning one page of merged hits.
+
+    Raises ValueError if a date bound cannot be parsed or the page lies past `limit`.
+    """
+    page = max(1, page)
+    page_size = max(1, min(page_size, MAX_SEARCH_PAGE_SIZE))
+    check_page(page, page_size, limit)
+    # Never fetch more per collection than is needed to fill this page (+1 to detect more)
+    limit = min(limit, page * page_size + 1)
+    results = await search_merged(keyword, date_from, date_to, sort, limit, per_collection_limit)
+
+    terms = search_terms(keyword)
+    start = (page - 1) * page_size
+    items = results[start:start + page_size]
+    for doc in items:
+        doc["highlights"] = highlight(doc, doc["collection"], terms)
+    return {"items": items, "page": page, "page_size": page_size, "has_more": len(results) > start + page_size}
+
+async def search_all_collections_ndjson(keyword, date_from=None, date_to=None, sort="score",
+                                        limit=DEFAULT_TOTAL_LIMIT, per_collection_limit=DEFAULT_COLLECTION_LIMIT):
+    """Yield merged search hits as newline-delimited JSON, a chunk of documents at a time."""
+    results = await search_merged(keyword, date_from, date_to, sort, limit, per_collection_limit)
+    terms = search_terms(keyword)
+    for i in range(0, len(results), EXPORT_CHUNK_DOCS):
+        chunk = results[i:i + EXPORT_CHUNK_DOCS]
+        for doc in chunk:
+            doc["highlights"] = highlight(doc, doc["collection"], terms)
+        yield ndjson_chunk(chunk)
+
+
+async def get_website_links(domain=None, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of known source URLs (from the known_urls registry), optionally for one domain."""
+    query = {"domain": url_domain("//" + domain)} if domain else {}
+    return await paginate(_collection(KNOWN_URLS_COLLECTION), query, limit, after, projection={"added_at": 0}, cursor_type=str)
+
+async def get_known_url(url):
+    """Return the registry entry for a URL, or None if no collection stores it."""
+    return await _collection(KNOWN_URLS_COLLECTION).find_one({"_id": url})
+
+
+# ===========================================CLEANED TABLES STUFF ==================================================#
+
+async def get_all_news_company_profiles():
+    """Return all documents from news_company_profiles collection."""
+    return await _collection("news_company_profiles").find().to_list(length=None)
+
+async def get_news_company_profiles(category=None, country=None):
+    """Return filtered documents from news_company_profiles collection."""
+    query = {}
+    if category:
+        # If category is a list, use $in; if string, convert to list
+        query["category"] = {"$in": category if isinstance(category, list) else [category]}
+    if country:
+        # If country is a list, use $in; if string, convert to list
+        query["country"] = {"$in": country if isinstance(country, list) else [country]}
+    return await _collection("news_company_profiles").find(query).to_list(length=None)
+
+# ---------- Dashboard Stats ----------
+
+async def get_stats_facets(category=None, country=None, sentiment=None, date_from=None, date_to=None):
+    """Profile counts per category, country and sentiment, read from the rollup.
+
+    Raises ValueError if a date bound cannot be parsed.
+    """
+    pipeline = facets_pipeline(category=category, country=country, sentiment=sentiment, date_from=date_from, date_to=date_to)
+    result = await (await _collection(ROLLUP_COLLECTION).aggregate(pipeline)).to_list(length=None)
+    return facets_response(result)
+
+async def get_stats_timeseries(interval="day", by=None, category=None, country=None, sentiment=None, date_from=None, date_to=None):
+    """Profile counts per day, week or month, optionally one series per `by` value.
+
+    Raises ValueError if a date bound cannot be parsed.
+    """
+    pipeline = timeseries_pipeline(
+        interval, by, category=category, country=country, sentiment=sentiment, date_from=date_from, date_to=date_to
+    )
+    result = await (await _collection(ROLLUP_COLLECTION).aggregate(pipeline)).to_list(length=None)
+    return timeseries_response(result, interval, by)
+
+# ---------- Spider URLs CRUD ----------
+
+async def get_all_spider_urls():
+    """Return all spider URLs."""
+    return await _collection("spider_urls").find().to_list(length=None)
+
+async def create_spider_url(url_text):
+    """Insert a new spider URL."""
+    result = await _collection("spider_urls").insert_one({"url": url_text})
+    return str(result.inserted_id)
+
+async def delete_spider_url(url_id):
+    """Delete a spider URL by ID."""
+    result = await _collection("spider_urls").delete_one({"_id": ObjectId(url_id)})
+    return result.deleted_count
+
+# ---------- NDJSON Export ----------
+EXPORT_COLLECTIONS = ("articles", "media_reports", "news_company_profiles")
+
+async def export_collection_ndjson(name):
+    """Yield a whole collection as newline-delimited JSON, a chunk of documents at a time."""
+    cursor = _collection(name).find().sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    docs = []
+    async for doc in cursor:
+        docs.append(doc)
+        if len(docs) >= EXPORT_CHUNK_DOCS:
+            yield ndjson_chunk(docs)
+            docs = []
+    if docs:
+        yield ndjson_chunk(docs)
@@ -0,0 +1,104 @@
+"""
+Load benchmark for the FastAPI app.
+
+Start the API (uvicorn main:app) and run, for example:
+
+    python bench_api.py --url "http://localhost:8000/articles/?limit=50" --concurrency 50 200
+
+Bulk ingestion throughput (documents/sec through POST /{collection}/bulk):
+
+    python bench_api.py --bulk 10000 --collection articles --batch 1000
+
+To compare before/after, run the same command against a server started
+from the older revision. Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+async def run_level(url, concurrency, duration):
+    """Keep `concurrency` clients busy for `duration` seconds and collect latencies."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+    }
+
+
+async def run_bulk(base_url, collection, total, batch):
+    """POST `total` generated documents as NDJSON in requests of `batch` and report docs/sec."""
+    url = f"{base_url.rstrip('/')}/{collection}/bulk"
+    url_field = "URL de la fuente original" if collection == "companies" else "URL"
+    run_id = int(time.time())
+    inserted = errors = 0
+    async with httpx.AsyncClient(timeout=300) as client:
+        started = time.perf_counter()
+        for start in range(0, total, batch):
+            lines = (
+                json.dumps({url_field: f"https://bench.invalid/{run_id}/{i}", "Título": f"Bench document {i}"})
+                for i in range(start, min(start + batch, total))
+            )
+            response = await client.post(
+                url, content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"}
+            )
+            response.raise_for_status()
+            body = response.json()
+            inserted += body["inserted"] + body["updated"]
+            errors += body["errors"]
+        elapsed = time.perf_counter() - started
+    print(f"{inserted} documents written, {errors} errors in {elapsed:.2f}s: {inserted / elapsed:.0f} docs/s")
+    print(f'Remove them afterwards with: db.{collection}.deleteMany({{"{url_field}": /^https:\\/\\/bench.invalid\\/{run_id}\\//}})')
+
+
+async def main(args):
+    if args.bulk:
+        await run_bulk(args.base_url, args.collection, args.bulk, args.batch)
+        return
+    print(f"Benchmarking {args.url} for {args.duration}s per level")
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for concurrency in args.concurrency:
+        r = await run_level(args.url, concurrency, args.duration)
+        print(f"{r['concurrency']:>8} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure requests/sec at fixed client concurrency.")
+    parser.add_argument("--url", default="http://localhost:8000/articles/?limit=50")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--bulk", type=int, default=0, help="benchmark bulk ingestion of this many documents")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--collection", default="articles", choices=["articles", "media_reports", "companies"])
+    parser.add_argument("--batch", type=int, default=1000, help="documents per bulk request")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""
+Benchmark and equivalence check for feed_parse.clean_html.
+
+Runs each fixture description through the BeautifulSoup-only cleaner that
+clean_html used to be and through the current one, fails if any output
+differs, and reports time per entry. Then times clean_html_batch over all
+fixtures in a process pool, as parse_feed does in feed_fetcher's workers.
+
+    python bench_clean_html.py --entries 5000
+    python bench_clean_html.py --feed saved_feed.xml --feed other.xml
+
+--feed uses the descriptions of saved RSS/Atom files as the fixtures
+instead of the generated WordPress-style ones. EDGE_CASES are added either way.
+"""
+import argparse
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import feedparser
+from bs4 import BeautifulSoup
+
+from feed_parse import _fast_text, clean_html, clean_html_batch
+
+PARAGRAPHS = [
+    "<p>Spain&#8217;s <strong>TaxDown</strong> has closed a &euro;4&nbsp;million round led by "
+    "<a href=\"https://example.com/bonsai?utm_source=rss&amp;utm_medium=feed\" target=\"_blank\" rel=\"noopener\">Bonsai Partners</a>.</p>",
+    "<p>&#8220;We identified that 8 out of 10 taxpayers are entitled to a refund,&#8221; said the CEO &#8211; "
+    "and 60% never claim it.</p>\n",
+    "<figure class=\"wp-block-image size-large\"><img decoding=\"async\" src=\"https://example.com/a.jpg\" alt=\"\" "
+    "class=\"wp-image-1\" srcset=\"https://example.com/a-300x200.jpg 300w, https://example.com/a.jpg 1024w\" /></figure>\n",
+    "<h2 class=\"wp-block-heading\">Technology that transforms the tax experience</h2>\n",
+    "<ul>\n<li>Mexico: 35% of operations</li>\n<li>1.5&nbsp;million users</li>\n</ul>\n",
+    "<!-- wp:paragraph --><p>Startups in S&atilde;o Paulo &amp; Bogot&aacute; raised US$ 120M.</p><!-- /wp:paragraph -->",
+    "<p>The post <a href=\"https://contxto.com/en/funding/x/\">TaxDown raises</a> appeared first on "
+    "<a href=\"https://contxto.com/en\">Contxto</a>.</p>",
+    "<blockquote class=\"wp-block-quote\"><p>Many people prefer not to touch anything</p><cite>Enrique Garc&iacute;a</cite></blockquote>",
+]
+UNUSUAL = [
+    "<script type=\"text/javascript\">var a = '<p>';</script>",
+    "<iframe src=\"https://www.youtube.com/embed/x\" width=\"560\"></iframe>",
+    "<p>Revenue grew &gt; 3x; margins &lt; 10% (AT&T, R&D)</p>",
+    "<p>Read more &raquo; [&hellip;]",
+]
+# Always checked, whatever the fixtures: references where html.unescape and
+# BeautifulSoup disagree, or nearly do
+EDGE_CASES = [
+    "a&#1;b", "a&#x7F;b", "&#xFFFE;", "&#1114111;", "&#xB;", "&#x1FFFF;", "&#xFDD0;x",
+    "&#0;", "&#x110000;", "&#55296;", "&#150;", "&#13;", "&#9;x", "&#65", "&#;",
+    "&#8217;&nbsp;&hellip;", "AT&T", "a &foo; b", "&Aacute", "&AMP;", "<![CDATA[hi]]>x",
+    "<a\x00>x", "<a\x00b>y", "a\x00b", "<p\x00 class=\"x\">z</p>",
+]
+
+
+def generated_fixtures(count, seed=0):
+    """WordPress-style descriptions: summaries, full content, and a share of harder markup."""
+    rng = random.Random(seed)
+    fixtures = []
+    for i in range(count):
+        parts = rng.choices(PARAGRAPHS, k=rng.choice([1, 2, 3, 8, 20]))
+        if i % 10 == 0:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(UNUSUAL))
+        fixtures.append("".join(parts))
+    return fixtures
+
+
+def feed_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        for entry in feedparser.parse(path).entries:
+            fixtures.append(entry.content[0].value if "content" in entry else entry.get("summary", ""))
+    return fixtures
+
+
+def clean_html_bs4(raw_html):
+    """clean_html before the fast path."""
+    soup = BeautifulSoup(raw_html, 'html.parser')
+    text = soup.get_text()
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def timed(function, fixtures):
+    started = time.perf_counter()
+    outputs = [function(raw_html) for raw_html in fixtures]
+    return outputs, time.perf_counter() - started
+
+
+def main(args):
+    fixtures = feed_fixtures(args.feed) if args.feed else generated_fixtures(args.entries)
+    fixtures += EDGE_CASES
+    size = sum(len(raw_html) for raw_html in fixtures) / max(len(fixtures), 1)
+    fast = sum(_fast_text(raw_html) is not None for raw_html in fixtures)
+    print(f"{len(fixtures)} descriptions, {size:.0f} chars on average, {fast / max(len(fixtures), 1):.0%} on the fast path")
+
+    expected, old_time = timed(clean_html_bs4, fixtures)
+    actual, new_time = timed(clean_html, fixtures)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    per_entry = lambda seconds: seconds / max(len(fixtures), 1) * 1e6
+    print(f"{'bs4':<12} {old_time:>8.3f}s {per_entry(old_time):>9.1f} µs/entry")
+    print(f"{'clean_html':<12} {new_time:>8.3f}s {per_entry(new_time):>9.1f} µs/entry  ({old_time / new_time:.1f}x)")
+
+    workers = args.workers or os.cpu_count() or 1
+    batches = [fixtures[i:i + args.batch] for i in range(0, len(fixtures), args.batch)]
+    with ProcessPoolExecutor(workers) as pool:
+        list(pool.map(clean_html_batch, batches[:workers]))  # start the workers outside the timing
+        started = time.perf_counter()
+        pooled = [text for batch in pool.map(clean_html_batch, batches) for text in batch]
+        pool_time = time.perf_counter() - started
+    print(f"{f'pool x{workers}':<12} {pool_time:>8.3f}s {per_entry(pool_time):>9.1f} µs/entry  (batches of {args.batch})")
+
+    if mismatches or pooled != expected:
+        for i in mismatches[:5]:
+            print(f"❌ {fixtures[i][:200]!r}\n   bs4:        {expected[i][:200]!r}\n   clean_html: {actual[i][:200]!r}")
+        raise SystemExit(f"{len(mismatches)} outputs differ from BeautifulSoup")
+    print("✅ Identical output on every fixture")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare clean_html with the BeautifulSoup-only version.")
+    parser.add_argument("--entries", type=int, default=5000, help="generated fixtures")
+    parser.add_argument("--feed", action="append", help="saved feed file to take descriptions from (repeatable)")
+    parser.add_argument("--workers", type=int, default=0, help="pool size (default one per CPU)")
+    parser.add_argument("--batch", type=int, default=50, help="descriptions per pool task")
+    main(parser.parse_args())
@@ -0,0 +1,132 @@
+"""
+Wall-time benchmark for fetching RSS feeds.
+
+Serves N generated feeds from a local stub HTTP server (spread over several
+ports, so they count as different hosts) and times:
+
+  * threads: the previous fetcher, requests + feedparser in a 10-thread pool
+  * async:   feed_fetcher.FeedFetcher, cold (every feed new) and warm (all 304)
+
+    python bench_feeds.py --feeds 500 --hosts 10 --latency 0.2 --items 20
+
+--latency is the stub's delay per response in seconds, standing in for a
+remote site. Nothing is written outside a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+import requests
+from aiohttp import web
+
+from feed_fetcher import FEED_FETCH_CONCURRENCY, FEED_FETCH_PER_HOST, FeedFetcher
+from feed_parse import parse_feed
+from feed_state import FeedStateStore
+
+ITEM = (
+    "<item><title>Startup {feed}-{i} raises a round</title>"
+    "<link>http://bench.invalid/{feed}/{i}</link>"
+    "<pubDate>{date}</pubDate>"
+    "<description><![CDATA[<p>Company <b>{feed}-{i}</b> announced <a href=\"#\">funding</a>.</p>\n<p>More text.</p>]]></description>"
+    "</item>"
+)
+
+
+def feed_body(feed, items):
+    date = formatdate(usegmt=True)
+    entries = "".join(ITEM.format(feed=feed, i=i, date=date) for i in range(items))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Bench feed {feed}</title><link>http://bench.invalid/{feed}</link>{entries}</channel></rss>"
+    ).encode()
+
+
+def start_stub(feeds, hosts, latency, items):
+    """Run the stub server in a background thread; returns the feed URLs."""
+    bodies = {str(feed): feed_body(feed, items) for feed in range(feeds)}
+    ports = []
+    ready = threading.Event()
+
+    async def handle(request):
+        await asyncio.sleep(latency)
+        body = bodies.get(request.match_info["feed"])
+        if body is None:
+            return web.Response(status=404)
+        etag = f'"{request.match_info["feed"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=body, content_type="application/rss+xml", headers={"ETag": etag})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{feed}/feed/", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        for _ in range(hosts):
+            site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+            await site.start()
+            ports.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return [f"http://127.0.0.1:{ports[feed % hosts]}/{feed}/feed/" for feed in range(feeds)]
+
+
+def fetch_threaded(urls):
+    """The pre-asyncio fetcher: one blocking download + parse per task, 10 at a time."""
+    session = requests.Session()
+
+    def fetch(url):
+        response = session.get(url, timeout=20)
+        return parse_feed(response.content, {k.lower(): v for k, v in response.headers.items()})
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        return sum(len(parsed["entries"]) for parsed in executor.map(fetch, urls))
+
+
+def report(label, started, entries, results=None):
+    elapsed = time.perf_counter() - started
+    detail = ""
+    if results is not None:
+        counts = {}
+        for result, _ in results.values():
+            counts[result] = counts.get(result, 0) + 1
+        detail = "  " + ", ".join(f"{n} {result}" for result, n in sorted(counts.items()))
+    print(f"{label:<14} {elapsed:>8.2f}s {entries:>8} entries{detail}")
+
+
+def main(args):
+    urls = start_stub(args.feeds, args.hosts, args.latency, args.items)
+    print(f"{args.feeds} feeds on {args.hosts} hosts, {args.items} items each, {args.latency * 1000:.0f} ms per response")
+
+    if not args.skip_threads:
+        started = time.perf_counter()
+        report("threads", started, fetch_threaded(urls))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = FeedFetcher(state=FeedStateStore(os.path.join(tmp, "feed_state.json")),
+                              concurrency=args.concurrency, per_host=args.per_host)
+        for label in ("async (cold)", "async (warm)"):
+            started = time.perf_counter()
+            results = asyncio.run(fetcher.fetch_all(urls))
+            entries = sum(len(parsed["entries"]) for _, parsed in results.values() if parsed)
+            report(label, started, entries, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time fetching many RSS feeds from a local stub server.")
+    parser.add_argument("--feeds", type=int, default=500)
+    parser.add_argument("--hosts", type=int, default=10, help="stub ports to spread the feeds over")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub delay per response, seconds")
+    parser.add_argument("--items", type=int, default=20, help="entries per feed")
+    parser.add_argument("--concurrency", type=int, default=FEED_FETCH_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=FEED_FETCH_PER_HOST)
+    parser.add_argument("--skip-threads", action="store_true", help="only time the async fetcher")
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark of response serialization for a page of MongoDB documents.
+
+Compares the old path (stringify each `_id`, then FastAPI's jsonable_encoder
+and json.dumps as JSONResponse renders it) with MongoJSONResponse (orjson,
+ObjectId and datetime encoded natively), plus the NDJSON export encoding:
+
+    python bench_serialization.py --docs 10000 --repeat 5
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import MongoJSONResponse, ndjson_chunk
+
+_WORDS = "fintech startup inversión ronda serie capital México Brasil Chile pagos crédito logística salud".split()
+
+
+def make_articles(n):
+    """Documents shaped like the articles collection."""
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(n):
+        docs.append({
+            "_id": ObjectId(),
+            "URL": f"https://example.com/noticias/{i}",
+            "Título": " ".join(random.choices(_WORDS, k=8)),
+            "Descripción en una frase": " ".join(random.choices(_WORDS, k=20)),
+            "Resumen": " ".join(random.choices(_WORDS, k=120)),
+            "Empresa": random.choice(["Nubank", "Rappi", "Kavak", "Clip"]),
+            "Fecha Publicación": (start + timedelta(hours=i)).strftime("%Y-%m-%d"),
+            "published_at": start + timedelta(hours=i),
+        })
+    return docs
+
+
+def old_response(docs):
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    return JSONResponse(jsonable_encoder({"items": docs, "next_cursor": None})).body
+
+
+def new_response(docs):
+    return MongoJSONResponse({"items": docs, "next_cursor": None}).body
+
+
+def old_ndjson(docs):
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+    return "\n".join(json.dumps(doc, default=default, ensure_ascii=False) for doc in docs) + "\n"
+
+
+def new_ndjson(docs):
+    return ndjson_chunk(docs)
+
+
+def best_of(func, n_docs, repeat):
+    """Best wall time in ms over `repeat` runs, each on a fresh copy of the documents."""
+    timings = []
+    for _ in range(repeat):
+        docs = make_articles(n_docs)  # old_response mutates its input
+        started = time.perf_counter()
+        func(docs)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serialization cost per N documents.")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{args.docs} documents, best of {args.repeat}")
+    for label, old, new in [("JSON page", old_response, new_response), ("NDJSON export", old_ndjson, new_ndjson)]:
+        old_ms = best_of(old, args.docs, args.repeat)
+        new_ms = best_of(new, args.docs, args.repeat)
+        print(f"{label:>14}: before {old_ms:8.1f} ms   after {new_ms:8.1f} ms   ({old_ms / new_ms:.1f}x)")
@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark for the API.
+
+Times `import main` in fresh interpreters, and optionally how long serve.py
+takes from launch until /readyz answers 200:
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --runs 3 --serve --workers 4
+
+Requires httpx for --serve (pip install httpx).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_import(runs):
+    """Wall time of `python -c "import main"`, one fresh process per run."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def time_ready(runs, workers, port, timeout):
+    """Seconds from launching serve.py until /readyz returns 200."""
+    import httpx
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                        timings.append(time.perf_counter() - started)
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.05)
+            else:
+                print(f"/readyz did not return 200 within {timeout}s")
+        finally:
+            server.terminate()
+            server.wait()
+    return timings
+
+
+def report(label, timings):
+    if timings:
+        print(f"{label}: median {statistics.median(timings):.3f}s  min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="also time serve.py until /readyz is 200")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    report("import main", time_import(args.runs))
+    if args.serve:
+        report(f"serve.py --workers {args.workers} until ready", time_ready(args.runs, args.workers, args.port, args.timeout))
@@ -0,0 +1,58 @@
+"""
+Micro-benchmark of the company name prefix index behind /companies/suggest.
+
+Builds the index from N synthetic company names and times lookups for
+random 1-4 character prefixes and incremental inserts:
+
+    python bench_suggest.py --names 100000 --queries 10000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from suggest import PrefixIndex
+
+_PARTS = ["Banco", "Grupo", "Tecnología", "Pagos", "Logística", "Salud", "Energía", "Inversiones", "Capital", "Digital"]
+
+
+def make_names(n):
+    names = set()
+    while len(names) < n:
+        word = "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 9))).capitalize()
+        names.add(" ".join([word] + random.sample(_PARTS, random.randint(0, 2))))
+    return list(names)
+
+
+def percentile(values, p):
+    return sorted(values)[int(len(values) * p) - 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefix index lookup latency.")
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    names = make_names(args.names)
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.build((name, random.randint(1, 20)) for name in names)
+    print(f"built from {len(index)} names in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    prefixes = [random.choice(names)[:random.randint(1, 4)] for _ in range(args.queries)]
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        timings.append((time.perf_counter() - started) * 1e6)
+    print(f"suggest: median {statistics.median(timings):.1f} µs  p99 {percentile(timings, 0.99):.1f} µs  max {max(timings):.1f} µs")
+
+    new_names = make_names(1000)
+    started = time.perf_counter()
+    for name in new_names:
+        index.add(name)
+    print(f"incremental add: {(time.perf_counter() - started) * 1e6 / len(new_names):.1f} µs per new name")
@@ -0,0 +1,149 @@
+import functools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from db import get_async_db
+from versions import get_versions
+
+load_dotenv()
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 300))
+CACHE_PERSIST_PATH = os.environ.get("CACHE_PERSIST_PATH")  # optional pickle file
+
+_MISS = object()
+
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after `ttl` seconds and are tagged by collection."""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, persist_path=CACHE_PERSIST_PATH):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._generations = {}  # tag -> number of invalidations so far
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or _MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def generation(self, tags):
+        """Snapshot of the invalidation counters for tags, taken before computing a value."""
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, tags, generation=None):
+        """Store value unless one of its tags was invalidated since `generation` was taken."""
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(tag, 0) for tag in tags):
+                return  # a write landed while the value was being computed
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag):
+        """Drop every entry tagged with tag (a collection name)."""
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            self.invalidations += 1
+            for key in [k for k, entry in self._entries.items() if tag in entry[1]]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    # ---------- Disk persistence ----------
+
+    def save(self):
+        """Write unexpired entries to persist_path, if configured."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # monotonic clocks do not survive restarts, so store remaining lifetimes
+            entries = [(k, e[0] - now, e[1], e[2]) for k, e in self._entries.items() if e[0] > now]
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entries, f)
+        os.replace(tmp_path, self.persist_path)
+
+    def load(self):
+        """Restore entries written by save(); a missing or unreadable file is ignored."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load response cache: {e}")
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key, remaining, tags, value in entries:
+                self._entries[key] = (now + remaining, tags, value)
+
+
+response_cache = TTLCache()
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(str(v) for v in value))
+    return value
+
+
+def cached(endpoint, tags):
+    """Cache an async endpoint's result by endpoint name, normalized query parameters and collection versions.
+
+    `tags` are the collections the result is built from. Their shared
+    version counters (versions.py) are part of the key, so a write from any
+    worker or script moves every process on to a fresh entry; writes through
+    this process also drop the old entries at once.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            versions = tuple(await get_versions(get_async_db(), tags))
+            key = (endpoint, versions, tuple(sorted((k, _normalize(v)) for k, v in kwargs.items())))
+            value = response_cache.get(key)
+            if value is not _MISS:
+                return value
+            generation = response_cache.generation(tags)
+            value = await func(**kwargs)
+            response_cache.set(key, value, tags, generation)
+            return value
+        return wrapper
+    return decorator
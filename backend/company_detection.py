@@ -4,6 +4,9 @@ import time
 from pymongo import MongoClient, errors
 import requests
 
+from feed import stamp_ingested
+from versions import bump
+
 # Load environment variables
 load_dotenv()
 MONGO_URI = os.environ.get("MONGO_URI")
@@ -72,6 +75,7 @@ MAX_API_CALLS = 100  # To avoid hitting daily quota
 SECONDS_BETWEEN_CALLS = 5  # 15 RPM = 1 call every 4 seconds; use 5 to be safe
 
 api_calls = 0
+updated = 0
 
 for doc in media_reports_collection.find({"Empresa": ""}):
     full_text = doc.get("Full Text", "")
@@ -83,11 +87,13 @@ for doc in media_reports_collection.find({"Empresa": ""}):
     if company:
         media_reports_collection.update_one(
             {"_id": doc["_id"]},
-            {"$set": {
+            # A new ingested_at puts the tagged report on /stream/articles
+            {"$set": stamp_ingested("media_reports", {
                 "Empresa": company,
                 "DetectionMethod": "direct"
-            }}
+            })}
         )
+        updated += 1
         print(f"Updated Empresa for document {doc['_id']} to {company} (direct match)")
         continue
 
@@ -101,14 +107,19 @@ for doc in media_reports_collection.find({"Empresa": ""}):
     if company:
         media_reports_collection.update_one(
             {"_id": doc["_id"]},
-            {"$set": {
+            # A new ingested_at puts the tagged report on /stream/articles
+            {"$set": stamp_ingested("media_reports", {
                 "Empresa": company,
                 "DetectionMethod": "gemini"
-            }}
+            })}
         )
+        updated += 1
         print(f"Updated Empresa for document {doc['_id']} to {company} (Gemini)")
     else:
         print(f"No company found for document {doc['_id']} (Gemini)")
 
     # Sleep to avoid exceeding RPM
     time.sleep(SECONDS_BETWEEN_CALLS)
+
+if updated:
+    bump(db, "media_reports")  # once for the whole run
@@ -0,0 +1,4 @@
+"""pytest setup for the backend tests (python -m pytest -q from backend/)."""
+
+# A manual LinkedIn scraping script that logs in at import, not a test
+collect_ignore = ["scraper_test.py"]
@@ -1,145 +1,353 @@
-from db import articles_collection, media_reports_collection, companies_collection, news_company_profiles_collection, spider_urls_collection
+from db import db, articles_collection, media_reports_collection, companies_collection, news_company_profiles_collection, spider_urls_collection
 from bson.objectid import ObjectId
-import re
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from dates import PUBLISHED_AT_FIELD, with_published_at
+from feed import INGESTED_AT_FIELD, stamp_ingested
+from cache import response_cache
+from suggest import COMPANY_NAME_FIELD, DEFAULT_SUGGEST_LIMIT, company_names
+from url_registry import register_urls, unregister_url
+from versions import bump
+from responses import ndjson_chunk
+from stats import (
+    PROFILES_COLLECTION, PROFILE_URL_FIELD, ROLLUP_COLLECTION, apply_rollup, article_dates_query, set_article_dates,
+    facets_pipeline, facets_response, timeseries_pipeline, timeseries_response
+)
+
+from concurrent.futures import ThreadPoolExecutor
+from search import (
+    URL_FIELDS, DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE, DEFAULT_COLLECTION_LIMIT, MAX_COLLECTION_LIMIT,
+    DEFAULT_TOTAL_LIMIT, MAX_TOTAL_LIMIT, check_page, text_query, search_order, search_projection, search_sort, search_terms, merge_results, highlight
+)
+
+def _written(name, removed=(), added=()):
+    """Keep derived state in step after a write to collection `name`.
+
+    `removed` are the documents as they were before the write (deleted or
+    pre-update), `added` as they are after it (inserted or post-update).
+    """
+    response_cache.invalidate(name)
+    bump(db, name)
+    if name == PROFILES_COLLECTION:
+        apply_rollup(db, removed, added)
+    if name == "companies":
+        company_names.apply(removed, added)
+    if name not in URL_FIELDS:
+        return
+    field = URL_FIELDS[name]
+    old_urls = {doc.get(field) for doc in removed} - {None, ""}
+    new_urls = {doc.get(field) for doc in added} - {None, ""}
+    for url in old_urls - new_urls:
+        unregister_url(db, name, url)
+    register_urls(db, name, new_urls - old_urls)
+
+# ---------- Pagination ----------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def paginate(collection, query=None, limit=DEFAULT_PAGE_SIZE, after=None, projection=None, cursor_type=ObjectId):
+    """Return one keyset page of documents ordered by _id, plus the cursor for the next page.
+
+    `cursor_type` converts `after` back to an _id value; with the default ObjectId
+    this raises bson.errors.InvalidId for a malformed cursor.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = dict(query or {})
+    if after:
+        query["_id"] = {"$gt": cursor_type(after)}
+    # Fetch one extra document to know whether another page exists
+    docs = list(collection.find(query, projection).sort("_id", 1).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["_id"])
+    return docs, next_cursor
 
 # ---------- Articles CRUD ----------
 def create_article(data):
     """Insert a new article."""
+    with_published_at("articles", data)
+    stamp_ingested("articles", data)
     result = articles_collection.insert_one(data)
+    _written("articles", added=[data])
     return str(result.inserted_id)
 
 def get_article(article_id):
     """Get a single article by ID."""
     return articles_collection.find_one({"_id": ObjectId(article_id)})
 
-def get_all_articles():
-    """Get all articles."""
-    return list(articles_collection.find())
+def get_all_articles(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of articles."""
+    return paginate(articles_collection, limit=limit, after=after)
+
+def get_articles_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of articles matching the given company name."""
+    return paginate(articles_collection, {"Empresa": empresa}, limit, after)
 
 def update_article(article_id, data):
     """Update an article by ID."""
-    result = articles_collection.update_one({"_id": ObjectId(article_id)}, {"$set": data})
-    return result.modified_count
+    with_published_at("articles", data)
+    stamp_ingested("articles", data)
+    old = articles_collection.find_one_and_update({"_id": ObjectId(article_id)}, {"$set": data})
+    if not old:
+        return 0
+    _written("articles", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items() if k != INGESTED_AT_FIELD))
 
 def delete_article(article_id):
     """Delete an article by ID."""
-    result = articles_collection.delete_one({"_id": ObjectId(article_id)})
-    return result.deleted_count
+    doc = articles_collection.find_one_and_delete({"_id": ObjectId(article_id)})
+    if not doc:
+        return 0
+    _written("articles", removed=[doc])
+    return 1
 
 # ---------- Media Reports CRUD ----------
 def create_media_report(data):
     """Insert a new media report."""
+    with_published_at("media_reports", data)
+    stamp_ingested("media_reports", data)
     result = media_reports_collection.insert_one(data)
+    _written("media_reports", added=[data])
     return str(result.inserted_id)
 
 def get_media_report(report_id):
     """Get a single media report by ID."""
     return media_reports_collection.find_one({"_id": ObjectId(report_id)})
 
-def get_all_media_reports():
-    """Get all media reports."""
-    return list(media_reports_collection.find())
+def get_all_media_reports(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of media reports."""
+    return paginate(media_reports_collection, limit=limit, after=after)
+
+def get_media_reports_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of media reports matching the given company name."""
+    return paginate(media_reports_collection, {"Empresa": empresa}, limit, after)
 
 def update_media_report(report_id, data):
     """Update a media report by ID."""
-    result = media_reports_collection.update_one({"_id": ObjectId(report_id)}, {"$set": data})
-    return result.modified_count
+    with_published_at("media_reports", data)
+    stamp_ingested("media_reports", data)
+    old = media_reports_collection.find_one_and_update({"_id": ObjectId(report_id)}, {"$set": data})
+    if not old:
+        return 0
+    _written("media_reports", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items() if k != INGESTED_AT_FIELD))
 
 def delete_media_report(report_id):
     """Delete a media report by ID."""
-    result = media_reports_collection.delete_one({"_id": ObjectId(report_id)})
-    return result.deleted_count
+    doc = media_reports_collection.find_one_and_delete({"_id": ObjectId(report_id)})
+    if not doc:
+        return 0
+    _written("media_reports", removed=[doc])
+    return 1
 
 # ---------- Companies CRUD ----------
 def create_company(data):
     """Insert a new company."""
+    with_published_at("companies", data)
     result = companies_collection.insert_one(data)
+    _written("companies", added=[data])
     return str(result.inserted_id)
 
 def get_company(company_id):
     """Get a single company by ID."""
     return companies_collection.find_one({"_id": ObjectId(company_id)})
 
-def get_all_companies():
-    """Get all companies."""
-    return list(companies_collection.find())
+def get_all_companies(limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of companies."""
+    return paginate(companies_collection, limit=limit, after=after)
 
-def get_companies_by_empresa(empresa: str):
-    """Get companies matching the given company name."""
-    return list(companies_collection.find({"Empresa protagonista (Nombre)": empresa}))
+def get_companies_by_empresa(empresa: str, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Get one page of companies matching the given company name."""
+    return paginate(companies_collection, {"Empresa protagonista (Nombre)": empresa}, limit, after)
 
 
 def update_company(company_id, data):
     """Update a company by ID."""
-    result = companies_collection.update_one({"_id": ObjectId(company_id)}, {"$set": data})
-    return result.modified_count
+    with_published_at("companies", data)
+    old = companies_collection.find_one_and_update({"_id": ObjectId(company_id)}, {"$set": data})
+    if not old:
+        return 0
+    _written("companies", removed=[old], added=[{**old, **data}])
+    return int(any(old.get(k) != v for k, v in data.items()))
 
 def delete_company(company_id):
     """Delete a company by ID."""
-    result = companies_collection.delete_one({"_id": ObjectId(company_id)})
-    return result.deleted_count
-
-
-def search_all_collections(keyword, date_from=None, date_to=None):
-    """Search articles, companies, and media_reports for the keyword and optional date range."""
+    doc = companies_collection.find_one_and_delete({"_id": ObjectId(company_id)})
+    if not doc:
+        return 0
+    _written("companies", removed=[doc])
+    return 1
+
+
+# ---------- Company Name Suggestions ----------
+COMPANY_NAME_COUNTS_PIPELINE = [{"$group": {"_id": f"${COMPANY_NAME_FIELD}", "count": {"$sum": 1}}}]
+
+def suggest_companies(q, limit=DEFAULT_SUGGEST_LIMIT):
+    """Company names starting with `q` (or with a word that does), ignoring case and accents."""
+    if company_names.is_stale():
+        company_names.begin_build()
+        counts = companies_collection.aggregate(COMPANY_NAME_COUNTS_PIPELINE)
+        company_names.build((c["_id"], c["count"]) for c in counts)
+    return company_names.suggest(q, limit)
+
+# ---------- Bulk Writes ----------
+BULK_COLLECTIONS = ("articles", "media_reports", "companies", PROFILES_COLLECTION)
+BULK_BATCH_SIZE = 1000  # operations per bulk_write call
+# Field an upsert matches on: the source URL, or the article URL for enriched profiles
+BULK_KEY_FIELDS = {**URL_FIELDS, PROFILES_COLLECTION: PROFILE_URL_FIELD}
+
+def build_bulk_ops(name, docs, upsert=False, offset=0):
+    """Turn a batch of documents into bulk_write operations.
+
+    Returns (ops, op_items, errors): op_items[i] is the (item index, document)
+    behind ops[i], and errors are results for items rejected before reaching
+    MongoDB. Item indexes start at `offset`.
+    """
+    field = BULK_KEY_FIELDS[name]
+    ops, op_items, errors = [], [], []
+    for i, doc in enumerate(docs, start=offset):
+        if not isinstance(doc, dict):
+            errors.append({"index": i, "status": "error", "error": "Item is not a valid JSON object"})
+            continue
+        with_published_at(name, doc)
+        stamp_ingested(name, doc)
+        if upsert:
+            url = doc.get(field)
+            if not url:
+                errors.append({"index": i, "status": "error", "error": f'Missing "{field}" needed to upsert'})
+                continue
+            doc.pop("_id", None)
+            ops.append(UpdateOne({field: url}, {"$set": doc}, upsert=True))
+        else:
+            ops.append(InsertOne(doc))  # pymongo sets doc["_id"]
+        op_items.append((i, doc))
+    return ops, op_items, errors
+
+def bulk_item_results(op_items, upsert, upserted_ids, write_errors):
+    """Return a result per operation of one bulk_write, given upserted ids and write errors by op index."""
     results = []
-    regex = re.compile(re.escape(keyword), re.IGNORECASE)
-
-    # --- ARTICLES ---
-    # article_fields = [
-    #     "Título", "Descripción en una frase", "Resumen", "Nombres de personas",
-    #     "Puesto", "Empresa", "Instituciones nombradas", "Categoría", "URL"
-    # ]
-
-    article_fields = ["Título", "Resumen", "Descripción en una frase"]
-
-
-    article_query = {"$or": [{field: regex} for field in article_fields]}
-    if date_from and date_to:
-        article_query["Fecha Publicación"] = {"$gte": date_from, "$lte": date_to}
-    articles = list(articles_collection.find(article_query))
-    for a in articles:
-        a["_id"] = str(a["_id"])
-        a["collection"] = "articles"
-        results.append(a)
-
-    # --- COMPANIES ---
-    # company_fields = [
-    #     "Empresa protagonista (Nombre)", "Titulo", "Descripción breve", "Resumen",
-    #     "Founder 1", "Founder 2", "Founder 3", "Other Founders", "Categoría/Sector",
-    #     "Player 1", "Player 2", "Player 3", "Other Player", "Ubicación"
-    # ]
-
-    company_fields = ["Empresa protagonista (Nombre)", "Titulo", "Descripción breve"]
-
-
-    company_query = {"$or": [{field: regex} for field in company_fields]}
-    if date_from and date_to:
-        company_query["Fecha de publicación"] = {"$gte": date_from, "$lte": date_to}
-    companies = list(companies_collection.find(company_query))
-    for c in companies:
-        c["_id"] = str(c["_id"])
-        c["collection"] = "companies"
-        results.append(c)
-
-    # --- MEDIA REPORTS ---
-    # media_fields = [
-    #     "Source", "Pais Fuente", "Tema Principal", "Sector", "Title", "Full Text", "URL"
-    # ]
-
-    media_fields = ["Title", "Full Text", "Tema Principal"]
-
-    media_query = {"$or": [{field: regex} for field in media_fields]}
-    if date_from and date_to:
-        media_query["Fecha Publicación"] = {"$gte": date_from, "$lte": date_to}
-    media_reports = list(media_reports_collection.find(media_query))
-    for m in media_reports:
-        m["_id"] = str(m["_id"])
-        m["collection"] = "media_reports"
-        results.append(m)
-
+    for op_index, (i, doc) in enumerate(op_items):
+        if op_index in write_errors:
+            results.append({"index": i, "status": "error", "error": write_errors[op_index]})
+        elif not upsert:
+            results.append({"index": i, "status": "inserted", "_id": str(doc["_id"])})
+        elif op_index in upserted_ids:
+            results.append({"index": i, "status": "inserted", "_id": str(upserted_ids[op_index])})
+        else:
+            results.append({"index": i, "status": "updated"})
     return results
 
+def bulk_changes(name, op_items, item_results, before, upsert=False):
+    """Return (removed, added) documents for _written after a bulk write.
+
+    Every insert adds its document. Upserts are grouped by BULK_KEY_FIELDS
+    key, as one batch may write a key more than once: the key's document in
+    `before` (read before writing) is removed once, and the document left
+    after all its writes, each $set over the last, is added once.
+    """
+    if not upsert:
+        return [], [doc for (_, doc), result in zip(op_items, item_results) if result["status"] != "error"]
+    field = BULK_KEY_FIELDS[name]
+    before = {doc.get(field): doc for doc in before}
+    after = {}
+    for (_, doc), result in zip(op_items, item_results):
+        if result["status"] == "error":
+            continue
+        key = doc.get(field)
+        after[key] = {**after.get(key, before.get(key, {})), **doc}
+    removed = [before[key] for key in after if key in before]
+    return removed, list(after.values())
+
+def bulk_before_query(name, op_items, upsert):
+    """Filter for the existing documents an upsert batch will update, or None for inserts."""
+    if not upsert or not op_items:
+        return None
+    field = BULK_KEY_FIELDS[name]
+    return {field: {"$in": [doc[field] for _, doc in op_items]}}
+
+def bulk_write_documents(name, docs, upsert=False, offset=0):
+    """Write a batch of documents with one unordered bulk_write and return a result per item.
+
+    With upsert, documents are matched on the collection's BULK_KEY_FIELDS
+    field and $set over any existing document instead of inserted.
+    """
+    if name == PROFILES_COLLECTION:
+        query = article_dates_query(docs)
+        if query:
+            set_article_dates(docs, articles_collection.find(query, {"URL": 1, PUBLISHED_AT_FIELD: 1}))
+    ops, op_items, results = build_bulk_ops(name, docs, upsert, offset)
+    before_query = bulk_before_query(name, op_items, upsert)
+    before = list(db[name].find(before_query)) if before_query else []
+    upserted_ids, write_errors = {}, {}
+    if ops:
+        try:
+            upserted_ids = db[name].bulk_write(ops, ordered=False).upserted_ids
+        except BulkWriteError as e:
+            upserted_ids = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            write_errors = {err["index"]: err["errmsg"] for err in e.details.get("writeErrors", [])}
+    item_results = bulk_item_results(op_items, upsert, upserted_ids, write_errors)
+    removed, added = bulk_changes(name, op_items, item_results, before, upsert)
+    if added:
+        _written(name, removed=removed, added=added)
+    return sorted(results + item_results, key=lambda r: r["index"])
+
+
+SEARCH_COLLECTIONS = {
+    "articles": articles_collection,
+    "companies": companies_collection,
+    "media_reports": media_reports_collection,
+}
+
+def _search_collection(name, keyword, date_from, date_to, sort, limit):
+    cursor = (
+        SEARCH_COLLECTIONS[name]
+        .find(text_query(name, keyword, date_from, date_to), search_projection(keyword))
+        .sort(search_sort(name, sort))
+        .limit(limit)
+    )
+    docs = list(cursor)
+    for doc in docs:
+        doc["collection"] = name
+    return docs
+
+def search_merged(keyword, date_from=None, date_to=None, sort="score",
+                  limit=DEFAULT_TOTAL_LIMIT, per_collection_limit=DEFAULT_COLLECTION_LIMIT):
+    """Query all searchable collections concurrently and return one merged, deduplicated hit list.
+
+    A blank keyword lists the documents in the date range, newest first.
+    """
+    keyword = (keyword or "").strip()
+    sort = search_order(keyword, sort)
+    limit = max(1, min(limit, MAX_TOTAL_LIMIT))
+    per_collection_limit = max(1, min(per_collection_limit, MAX_COLLECTION_LIMIT, limit))
+    with ThreadPoolExecutor(max_workers=len(SEARCH_COLLECTIONS)) as executor:
+        result_lists = list(executor.map(
+            lambda name: _search_collection(name, keyword, date_from, date_to, sort, per_collection_limit),
+            SEARCH_COLLECTIONS
+        ))
+    return merge_results(result_lists, sort, limit)
+
+def search_all_collections(keyword, date_from=None, date_to=None, page=1, page_size=DEFAULT_SEARCH_PAGE_SIZE,
+                           sort="score", limit=DEFAULT_TOTAL_LIMIT, per_collection_limit=DEFAULT_COLLECTION_LIMIT):
+    """Full-text search of articles, companies and media_reports, returning one page of merged hits.
+
+    Raises ValueError if a date bound cannot be parsed or the page lies past `limit`.
+    """
+    page = max(1, page)
+    page_size = max(1, min(page_size, MAX_SEARCH_PAGE_SIZE))
+    check_page(page, page_size, limit)
+    # Never fetch more per collection than is needed to fill this page (+1 to detect more)
+    limit = min(limit, page * page_size + 1)
+    results = search_merged(keyword, date_from, date_to, sort, limit, per_collection_limit)
+
+    terms = search_terms(keyword)
+    start = (page - 1) * page_size
+    items = results[start:start + page_size]
+    for doc in items:
+        doc["highlights"] = highlight(doc, doc["collection"], terms)
+    return {"items": items, "page": page, "page_size": page_size, "has_more": len(results) > start + page_size}
+
 
 
 # ===========================================CLEANED TABLES STUFF ==================================================#
@@ -159,14 +367,31 @@ def get_news_company_profiles(category=None, country=None):
         query["country"] = {"$in": country if isinstance(country, list) else [country]}
     return list(news_company_profiles_collection.find(query))
 
+# ---------- Dashboard Stats ----------
+
+def get_stats_facets(category=None, country=None, sentiment=None, date_from=None, date_to=None):
+    """Profile counts per category, country and sentiment, read from the rollup.
+
+    Raises ValueError if a date bound cannot be parsed.
+    """
+    pipeline = facets_pipeline(category=category, country=country, sentiment=sentiment, date_from=date_from, date_to=date_to)
+    return facets_response(list(db[ROLLUP_COLLECTION].aggregate(pipeline)))
+
+def get_stats_timeseries(interval="day", by=None, category=None, country=None, sentiment=None, date_from=None, date_to=None):
+    """Profile counts per day, week or month, optionally one series per `by` value.
+
+    Raises ValueError if a date bound cannot be parsed.
+    """
+    pipeline = timeseries_pipeline(
+        interval, by, category=category, country=country, sentiment=sentiment, date_from=date_from, date_to=date_to
+    )
+    return timeseries_response(list(db[ROLLUP_COLLECTION].aggregate(pipeline)), interval, by)
+
 # ---------- Spider URLs CRUD ----------
 
 def get_all_spider_urls():
     """Return all spider URLs."""
-    urls = list(spider_urls_collection.find())
-    for url in urls:
-        url["_id"] = str(url["_id"])
-    return urls
+    return list(spider_urls_collection.find())
 
 def create_spider_url(url_text):
     """Insert a new spider URL."""
@@ -177,3 +402,24 @@ def delete_spider_url(url_id):
     """Delete a spider URL by ID."""
     result = spider_urls_collection.delete_one({"_id": ObjectId(url_id)})
     return result.deleted_count
+
+# ---------- NDJSON Export ----------
+EXPORT_COLLECTIONS = {
+    "articles": articles_collection,
+    "media_reports": media_reports_collection,
+    "news_company_profiles": news_company_profiles_collection,
+}
+EXPORT_BATCH_SIZE = 1000  # documents per getMore round trip
+EXPORT_CHUNK_DOCS = 200  # documents per chunk written to the response
+
+def export_collection_ndjson(name):
+    """Yield a whole collection as newline-delimited JSON, a chunk of documents at a time."""
+    cursor = EXPORT_COLLECTIONS[name].find().sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    docs = []
+    for doc in cursor:
+        docs.append(doc)
+        if len(docs) >= EXPORT_CHUNK_DOCS:
+            yield ndjson_chunk(docs)
+            docs = []
+    if docs:
+        yield ndjson_chunk(docs)
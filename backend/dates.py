@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+# Normalized BSON datetime (UTC) written next to the free-form source date
+PUBLISHED_AT_FIELD = "published_at"
+
+# Free-form publication date field per collection
+SOURCE_DATE_FIELDS = {
+    "articles": "Fecha Publicación",
+    "companies": "Fecha de publicación",
+    "media_reports": "Fecha Publicación",
+}
+
+# Formats seen from the spider (after its own YYYY-MM-DD attempt fails) and manual uploads
+_DATE_FORMATS = ["%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"]
+
+
+def _to_utc(dt):
+    """Return a naive UTC datetime, which is how pymongo stores dates."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def parse_date(value):
+    """Parse a stored publication date (ISO, YYYY-MM-DD, RFC-822, ...) into a UTC datetime, or None."""
+    if isinstance(value, datetime):
+        return _to_utc(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+
+    try:
+        return _to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        pass
+    try:
+        return _to_utc(parsedate_to_datetime(value))  # RFC-822, as used by RSS
+    except (TypeError, ValueError, IndexError):
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def with_published_at(name, data):
+    """Set published_at on a document (or $set payload) that carries the collection's source date field."""
+    source_field = SOURCE_DATE_FIELDS.get(name)
+    if source_field and source_field in data:
+        data[PUBLISHED_AT_FIELD] = parse_date(data[source_field])
+    return data
+
+
+def date_range(date_from=None, date_to=None):
+    """Build a published_at range filter from YYYY-MM-DD bounds; date_to includes the whole day.
+
+    Raises ValueError if a bound cannot be parsed.
+    """
+    bounds = {}
+    if date_from:
+        start = parse_date(date_from)
+        if start is None:
+            raise ValueError(f"Invalid date: {date_from}")
+        bounds["$gte"] = start
+    if date_to:
+        end = parse_date(date_to)
+        if end is None:
+            raise ValueError(f"Invalid date: {date_to}")
+        if len(date_to.strip()) == 10:  # a bare day: include all of it
+            end += timedelta(days=1)
+            bounds["$lt"] = end
+        else:
+            bounds["$lte"] = end
+    return bounds
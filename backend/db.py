@@ -1,25 +1,121 @@
 from dotenv import load_dotenv
 import os
-from pymongo import MongoClient,errors
+import threading
+from pymongo import AsyncMongoClient, MongoClient
+
+from metrics import command_metrics
 
 # MongoDB connection string
 load_dotenv()
 MONGO_URI = os.environ.get("MONGO_URI")
+DB_NAME = "latam_news"
+
+# Connection pool settings (per client, per process)
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+
+# Timeouts and read preference
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 0)) or None  # 0 = no timeout
+MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primary")  # e.g. primaryPreferred, secondaryPreferred
+
+# Per-command timings for /metrics; set MONGO_COMMAND_METRICS=0 to turn off
+MONGO_COMMAND_METRICS = os.environ.get("MONGO_COMMAND_METRICS", "1") != "0"
+
+POOL_OPTIONS = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+    "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+}
+
+CLIENT_OPTIONS = {
+    **POOL_OPTIONS,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+    "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    "readPreference": MONGO_READ_PREFERENCE,
+    "event_listeners": [command_metrics] if MONGO_COMMAND_METRICS else [],
+}
+
+# Clients are created on first use, never at import time: a mongodb+srv URI
+# costs a DNS lookup when a client is constructed, and a client must not be
+# shared across fork(). Each process (e.g. each server worker) gets its own.
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+_async_client = None
+_async_client_pid = None
+
+def get_client():
+    """Return this process's MongoClient, creating it on first use."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                # A client inherited from the parent process is dropped, not closed:
+                # its sockets belong to the parent.
+                _client = MongoClient(MONGO_URI, connect=False, **CLIENT_OPTIONS)
+                _client_pid = os.getpid()
+    return _client
+
+def get_db():
+    """Return the latam_news database on this process's sync client."""
+    return get_client()[DB_NAME]
+
+class _Lazy:
+    """Stands in for a Database or Collection and resolves it against this process's client on every use."""
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+    def __repr__(self):
+        return f"<lazy {self._resolve()!r}>"
+
+# Module-level handles kept for `from db import db, articles_collection, ...`
+db = _Lazy(get_db)
+articles_collection = _Lazy(lambda: get_db()['articles'])
+media_reports_collection = _Lazy(lambda: get_db()['media_reports'])
+companies_collection = _Lazy(lambda: get_db()['companies'])
+news_company_profiles_collection = _Lazy(lambda: get_db()['news_company_profiles'])
+spider_urls_collection = _Lazy(lambda: get_db()['spider_urls'])
+
+def __getattr__(name):
+    # `db.client` used to be a module attribute
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command('ping')
-    print("Successfully connected to MongoDB!")
-except errors.ServerSelectionTimeoutError as err:
-    print("Could not connect to MongoDB:", err)
+def ping():
+    """Round-trip to the server with the sync client; raises PyMongoError if it is unreachable."""
+    get_client().admin.command("ping")
 
-client = MongoClient(MONGO_URI)
-db = client['latam_news']
+# Async client for the FastAPI app. It binds to the running event loop,
+# so it is created on first use rather than at import time.
+def get_async_db():
+    """Return the latam_news database on this process's async client."""
+    global _async_client, _async_client_pid
+    if _async_client is None or _async_client_pid != os.getpid():
+        _async_client = AsyncMongoClient(MONGO_URI, connect=False, **CLIENT_OPTIONS)
+        _async_client_pid = os.getpid()
+    return _async_client[DB_NAME]
 
-# Access collections
-articles_collection = db['articles']
-media_reports_collection = db['media_reports']
-companies_collection = db['companies']
-news_company_profiles_collection = db['news_company_profiles']
-spider_urls_collection = db['spider_urls']
+async def ping_async():
+    """Round-trip to the server with the async client; raises PyMongoError if it is unreachable."""
+    await get_async_db().command("ping")
 
+async def close_async_client():
+    """Close the async client, if one was opened."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,194 @@
+"""
+Append-only storage for collected RSS entries, partitioned by day.
+
+Each save writes a new JSONL segment under the day the entries were fetched
+(UTC); nothing already written is rewritten:
+
+    rss_entries/
+        date=2025-05-08/
+            segment-20250508T001843701095-3f2a9c.jsonl
+            segment-20250508T001916585238-81be04.jsonl
+
+A segment is written to a .tmp file, flushed to disk and then renamed, so a
+reader never sees a half-written one. `compact` merges a day's segments
+into one `compacted-<last segment>.jsonl`; readers skip segments that a
+compacted file already covers, so a crash between writing it and deleting
+the old segments cannot duplicate entries.
+
+    python entry_store.py compact                  # days before today (UTC)
+    python entry_store.py compact --before 2025-06-01
+    python entry_store.py cat --from 2025-05-01 --to 2025-05-31 > may.jsonl
+    python entry_store.py import rss_feed_data.csv # load the old single CSV
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import date, datetime, timezone
+
+from rss_config import ENTRY_STORE_DIR
+
+_PARTITION = re.compile(r"^date=(\d{4}-\d{2}-\d{2})$")
+_FILE = re.compile(r"^(segment|compacted)-(\d{8}T\d{12}-[0-9a-f]+)\.jsonl$")
+
+
+def _partition_dir(root, day):
+    return os.path.join(root, f"date={day.isoformat()}")
+
+
+def _write_atomic(path, lines):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class EntryStore:
+    """Day-partitioned JSONL segments under `root`."""
+
+    def __init__(self, root=ENTRY_STORE_DIR):
+        self.root = root
+
+    # ---------- Writing ----------
+
+    def append(self, entries, fetched_at=None):
+        """Write `entries` as one new segment of the fetch day; returns its path, or None if there were none.
+
+        Each entry is stored with a `fetched_at` ISO timestamp.
+        """
+        if not entries:
+            return None
+        fetched_at = fetched_at or datetime.utcnow()
+        stamp = fetched_at.isoformat()
+        directory = _partition_dir(self.root, fetched_at.date())
+        os.makedirs(directory, exist_ok=True)
+        # Timestamp first so segment names sort in write order; the suffix keeps concurrent writers apart
+        name = f"segment-{fetched_at.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}.jsonl"
+        path = os.path.join(directory, name)
+        _write_atomic(path, (json.dumps({**entry, "fetched_at": stamp}, ensure_ascii=False) + "\n" for entry in entries))
+        return path
+
+    # ---------- Reading ----------
+
+    def days(self, date_from=None, date_to=None):
+        """Partition days present, oldest first, within the inclusive bounds."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            match = _PARTITION.match(name)
+            if match:
+                day = date.fromisoformat(match.group(1))
+                if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                    found.append(day)
+        return sorted(found)
+
+    def segments(self, day):
+        """Live files of a day in write order: its latest compacted file, then segments written after it."""
+        directory = _partition_dir(self.root, day)
+        compacted, segments = [], []
+        for name in os.listdir(directory):
+            match = _FILE.match(name)
+            if match:
+                (compacted if match.group(1) == "compacted" else segments).append((match.group(2), name))
+        live = []
+        covered = ""
+        if compacted:
+            covered, name = max(compacted)
+            live.append(name)
+        live += [name for key, name in sorted(segments) if key > covered]
+        return [os.path.join(directory, name) for name in live]
+
+    def iter_entries(self, date_from=None, date_to=None):
+        """Yield stored entries fetched between two dates (inclusive), one at a time, in write order."""
+        for day in self.days(date_from, date_to):
+            for path in self.segments(day):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+
+    # ---------- Compaction ----------
+
+    def compact(self, day):
+        """Merge a day's files into one compacted file and delete what it replaces; returns the number of files merged."""
+        live = self.segments(day)
+        if len(live) < 2:
+            return 0
+        last_key = _FILE.match(os.path.basename(live[-1])).group(2)
+        target = os.path.join(_partition_dir(self.root, day), f"compacted-{last_key}.jsonl")
+
+        def lines():
+            for path in live:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            yield line if line.endswith("\n") else line + "\n"
+
+        _write_atomic(target, lines())
+        directory = _partition_dir(self.root, day)
+        for name in os.listdir(directory):
+            match = _FILE.match(name)
+            # Everything up to the new file's key is now inside it, including leftovers of an interrupted run
+            if match and name != os.path.basename(target) and match.group(2) <= last_key:
+                os.remove(os.path.join(directory, name))
+        return len(live)
+
+
+def csv_entries(path):
+    """Entries of a CSV written by the old save_to_csv, as (fetched_at, entry) pairs.
+
+    The old fetched_at is the writer's local time (datetime.now()), so run the
+    import in the same time zone; it is converted to UTC like the store's own stamps.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            fetched_at = row.pop("fetched_at", None)
+            if fetched_at:
+                yield datetime.fromisoformat(fetched_at).astimezone(timezone.utc).replace(tzinfo=None), row
+            else:
+                yield datetime.utcnow(), row
+
+
+entry_store = EntryStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Day-partitioned RSS entry storage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="merge each day's segments into one file")
+    compact.add_argument("--before", type=date.fromisoformat, help="only days before this date (default today, UTC)")
+    cat = commands.add_parser("cat", help="print entries as JSON lines")
+    cat.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    cat.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    load = commands.add_parser("import", help="store the entries of an old CSV")
+    load.add_argument("csv_path")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        # Partitions are UTC days, and today's is still being appended to
+        today = datetime.utcnow().date()
+        if args.before and args.before > today:
+            sys.exit(f"❌ --before {args.before} would compact today's partition ({today} UTC), which is still being written")
+        args.before = args.before or today
+        for day in entry_store.days():
+            if day < args.before:
+                merged = entry_store.compact(day)
+                if merged:
+                    print(f"🗜️ {day}: merged {merged} files")
+    elif args.command == "cat":
+        for entry in entry_store.iter_entries(args.date_from, args.date_to):
+            sys.stdout.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    elif args.command == "import":
+        by_time = {}
+        for fetched_at, entry in csv_entries(args.csv_path):
+            by_time.setdefault(fetched_at, []).append(entry)
+        for fetched_at, entries in sorted(by_time.items()):
+            entry_store.append(entries, fetched_at)
+        print(f"➕ Imported {sum(len(e) for e in by_time.values())} entries from {args.csv_path}")
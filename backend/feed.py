@@ -0,0 +1,180 @@
+"""
+Live feed of articles and media reports for /stream/articles.
+
+One watcher per API process reads new and updated documents and fans them
+out to every connected client, so a hundred open dashboard tabs cost one
+upstream query stream. The watcher uses a MongoDB change stream when the
+server supports one (replica sets, Atlas) and otherwise polls the indexed
+ingested_at field, which the crud.py/async_crud.py writes stamp. It runs
+only while at least one client is connected.
+
+Events carry the document's ingested_at as their id, so a client that
+reconnects with Last-Event-ID first gets what it missed (up to
+FEED_BACKFILL_LIMIT documents), then live events.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from db import get_async_db
+
+INGESTED_AT_FIELD = "ingested_at"
+# Collection -> SSE event name
+FEED_COLLECTIONS = {"articles": "article", "media_reports": "media_report"}
+
+FEED_MODE = os.environ.get("FEED_MODE", "auto")  # auto, changestream or poll
+FEED_POLL_SECONDS = float(os.environ.get("FEED_POLL_SECONDS", 2))
+FEED_QUEUE_SIZE = int(os.environ.get("FEED_QUEUE_SIZE", 1000))
+FEED_BACKFILL_LIMIT = 500
+FEED_POLL_BATCH = 500
+# Polls re-read this far back, so a write stamped by a slightly slower clock is not skipped
+FEED_POLL_OVERLAP = timedelta(seconds=5)
+FEED_RETRY_SECONDS = 5
+
+
+def stamp_ingested(name, data):
+    """Set ingested_at on a document (or $set payload) written to a feed collection."""
+    if name in FEED_COLLECTIONS:
+        data[INGESTED_AT_FIELD] = datetime.now(timezone.utc)
+    return data
+
+
+def event_id(doc):
+    """SSE id of a document: its ingested_at in ISO 8601, or "" if it has none."""
+    ingested_at = doc.get(INGESTED_AT_FIELD)
+    return ingested_at.isoformat() if isinstance(ingested_at, datetime) else ""
+
+
+def parse_event_id(value):
+    """Turn a Last-Event-ID header back into a UTC datetime; None if it is not one of ours."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def documents_since(since, collections=FEED_COLLECTIONS, limit=FEED_BACKFILL_LIMIT):
+    """(collection, document) pairs ingested after `since`, oldest first, at most `limit`."""
+    db = get_async_db()
+    found = []
+    for name in collections:
+        cursor = db[name].find({INGESTED_AT_FIELD: {"$gt": since}}).sort(INGESTED_AT_FIELD, 1).limit(limit)
+        found += [(name, doc) async for doc in cursor]
+    found.sort(key=lambda item: item[1][INGESTED_AT_FIELD])
+    return found[:limit]
+
+
+async def documents_after(name, start, batch_size=FEED_POLL_BATCH):
+    """Yield every document of a collection ingested after `start`, oldest first.
+
+    Pages on (ingested_at, _id) until a batch comes back short, so any number
+    of documents sharing one timestamp window is read to the end.
+    """
+    collection = get_async_db()[name]
+    query = {INGESTED_AT_FIELD: {"$gt": start}}
+    while True:
+        cursor = collection.find(query).sort([(INGESTED_AT_FIELD, 1), ("_id", 1)]).limit(batch_size)
+        batch = [doc async for doc in cursor]
+        for doc in batch:
+            yield doc
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        query = {"$and": [{INGESTED_AT_FIELD: {"$gt": start}}, {"$or": [
+            {INGESTED_AT_FIELD: {"$gt": last[INGESTED_AT_FIELD]}},
+            {INGESTED_AT_FIELD: last[INGESTED_AT_FIELD], "_id": {"$gt": last["_id"]}},
+        ]}]}
+
+
+class Feed:
+    """Watches the feed collections and copies every change into each subscriber's queue."""
+
+    def __init__(self, mode=FEED_MODE):
+        self.mode = mode
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self):
+        """Return a queue of (collection, document) pairs; None in it means the client fell behind."""
+        queue = asyncio.Queue(FEED_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _publish(self, name, doc):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((name, doc))
+            except asyncio.QueueFull:
+                # Cut off a client that cannot keep up; it reconnects with Last-Event-ID
+                self._subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.mode == "poll":
+                    await self._poll()
+                else:
+                    await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if self.mode != "auto":
+                    print(f"⚠️ Feed change stream failed, retrying: {e}")
+                    await asyncio.sleep(FEED_RETRY_SECONDS)
+                    continue
+                # e.g. a standalone server, which has no change streams
+                print(f"ℹ️ Change streams unavailable ({e}); polling {INGESTED_AT_FIELD} every {FEED_POLL_SECONDS:g}s")
+                self.mode = "poll"
+            except PyMongoError as e:
+                print(f"⚠️ Feed watcher error, retrying: {e}")
+                await asyncio.sleep(FEED_RETRY_SECONDS)
+
+    async def _watch(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(FEED_COLLECTIONS)},
+            "operationType": {"$in": ["insert", "update", "replace"]},
+        }}]
+        async with await get_async_db().watch(pipeline, full_document="updateLookup") as stream:
+            if self.mode == "auto":
+                self.mode = "changestream"
+            async for change in stream:
+                doc = change.get("fullDocument")
+                if doc is not None:  # deleted before the lookup
+                    self._publish(change["ns"]["coll"], doc)
+
+    async def _poll(self):
+        since = datetime.now(timezone.utc)
+        seen = {}  # (collection, _id) -> ingested_at, for documents inside the overlap window
+        while True:
+            for name in FEED_COLLECTIONS:
+                async for doc in documents_after(name, since - FEED_POLL_OVERLAP):
+                    key = (name, doc["_id"])
+                    if seen.get(key) != doc[INGESTED_AT_FIELD]:
+                        seen[key] = doc[INGESTED_AT_FIELD]
+                        self._publish(name, doc)
+            if seen:
+                since = max(since, max(seen.values()).replace(tzinfo=timezone.utc))
+                seen = {k: v for k, v in seen.items() if v.replace(tzinfo=timezone.utc) > since - FEED_POLL_OVERLAP}
+            await asyncio.sleep(FEED_POLL_SECONDS)
+
+
+feed = Feed()
@@ -0,0 +1,187 @@
+"""
+asyncio feed fetcher: many feeds downloaded concurrently over pooled connections.
+
+At most FEED_FETCH_CONCURRENCY requests are in flight at once, and at most
+FEED_FETCH_PER_HOST to any one host, so a large source list does not hammer
+a single site. Timeouts, connection errors, 429 and 5xx responses are
+retried FEED_FETCH_RETRIES times with jittered exponential backoff (or the
+server's Retry-After). Requests are conditional on the ETag / Last-Modified
+in feed_state.json, and an unchanged body is recognised by its hash.
+
+Bodies that did change are parsed in a process pool of FEED_PARSE_WORKERS
+(default: one per CPU), off the event loop and outside the GIL. Set
+FEED_PARSE_WORKERS=0 to parse in threads instead. A feed that fails to
+parse is recorded as an "error" and parsed again on its next fetch; a pool
+whose worker died is replaced.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+import aiohttp
+import feedparser
+
+from feed_parse import parse_feed
+from feed_state import feed_state
+
+FEED_FETCH_CONCURRENCY = int(os.environ.get("FEED_FETCH_CONCURRENCY", 64))
+FEED_FETCH_PER_HOST = int(os.environ.get("FEED_FETCH_PER_HOST", 4))
+FEED_FETCH_TIMEOUT_SECONDS = float(os.environ.get("FEED_FETCH_TIMEOUT_SECONDS", 20))
+FEED_FETCH_RETRIES = int(os.environ.get("FEED_FETCH_RETRIES", 2))
+FEED_FETCH_BACKOFF_SECONDS = 0.5
+FEED_FETCH_MAX_RETRY_AFTER_SECONDS = 30
+FEED_PARSE_WORKERS = int(os.environ.get("FEED_PARSE_WORKERS", os.cpu_count() or 1))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_parse_pool = None
+
+
+def parse_pool():
+    """Process pool for parse_feed, started on first use and kept for later runs; None means parse in threads."""
+    global _parse_pool
+    if FEED_PARSE_WORKERS > 0 and _parse_pool is None:
+        # Not fork: this process runs the scheduler's and the event loop's threads, and a
+        # forked child can inherit a lock one of them held. Workers start from a forkserver
+        # with feed_parse preloaded (spawn where there is none).
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload(["feed_parse"])
+        _parse_pool = ProcessPoolExecutor(FEED_PARSE_WORKERS, mp_context=context)
+    return _parse_pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool, so the next parse starts a new one."""
+    global _parse_pool
+    if _parse_pool is pool:
+        _parse_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Retry(Exception):
+    def __init__(self, reason, delay=None):
+        super().__init__(reason)
+        self.delay = delay
+
+
+def _retry_after(value):
+    try:
+        return min(float(value), FEED_FETCH_MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return None  # an HTTP date; use our own backoff
+
+
+class FeedFetcher:
+    """Fetches and parses a batch of feeds concurrently, recording each outcome in a FeedStateStore."""
+
+    def __init__(self, state=feed_state, concurrency=FEED_FETCH_CONCURRENCY, per_host=FEED_FETCH_PER_HOST,
+                 timeout=FEED_FETCH_TIMEOUT_SECONDS, retries=FEED_FETCH_RETRIES):
+        self.state = state
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+
+    async def fetch_all(self, urls, force=()):
+        """Fetch every URL; returns {url: (result, parsed)} as described in fetch()."""
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": feedparser.USER_AGENT},
+        ) as session:
+            results = await asyncio.gather(
+                *(self.fetch(session, url, url in force) for url in urls), return_exceptions=True
+            )
+        outcomes = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                # One feed's failure must not lose the rest of the batch
+                self.state.record(url, "error", error=str(result) or type(result).__name__)
+                result = ("error", None)
+            outcomes[url] = result
+        return outcomes
+
+    async def fetch(self, session, url, force=False):
+        """Download and parse one feed unless it is unchanged since the last fetch.
+
+        Returns (result, parsed): result is "not_modified", "unchanged",
+        "changed" or "error", and parsed is parse_feed()'s output for
+        "changed" only. With force, saved validators are ignored.
+        """
+        saved = {} if force else self.state.get(url)
+        headers = {}
+        if saved.get("etag"):
+            headers["If-None-Match"] = saved["etag"]
+        if saved.get("modified"):
+            headers["If-Modified-Since"] = saved["modified"]
+        try:
+            status, response_headers, body = await self._get(session, url, headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, _Retry) as e:
+            self.state.record(url, "error", error=str(e) or type(e).__name__)
+            return "error", None
+        if status == 304:
+            self.state.record(url, "not_modified")
+            return "not_modified", None
+        if status >= 400:
+            self.state.record(url, "error", error=f"HTTP {status}")
+            return "error", None
+
+        validators = {"etag": response_headers.get("etag"), "modified": response_headers.get("last-modified")}
+        content_hash = hashlib.sha256(body).hexdigest()
+        if content_hash == saved.get("content_hash"):
+            self.state.record(url, "unchanged", **validators)
+            return "unchanged", None
+        try:
+            parsed = await self._parse(body, response_headers)
+        except Exception as e:
+            # content_hash and validators are not saved, so the body is fetched and parsed again next time
+            self.state.record(url, "error", error=f"parse failed: {str(e) or type(e).__name__}")
+            return "error", None
+        self.state.record(url, "changed", content_hash=content_hash, error="", **validators)
+        return "changed", parsed
+
+    async def _parse(self, body, response_headers):
+        pool = parse_pool()
+        if pool is None:
+            return await asyncio.to_thread(parse_feed, body, response_headers)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, parse_feed, body, response_headers)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+    async def _get(self, session, url, headers):
+        """GET with retries; returns (status, lowercased headers, body)."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            try:
+                # Host slot first, so waiting on a busy host does not hold a global slot
+                async with self._host_slots[host], self._slots:
+                    async with session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES:
+                            raise _Retry(f"HTTP {response.status}", _retry_after(response.headers.get("Retry-After")))
+                        body = await response.read()
+                        return response.status, {k.lower(): v for k, v in response.headers.items()}, body
+            except (aiohttp.ClientError, asyncio.TimeoutError, _Retry) as e:
+                if attempt == self.retries:
+                    raise
+                delay = getattr(e, "delay", None)
+                if delay is None:
+                    delay = FEED_FETCH_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+                await asyncio.sleep(delay)
+
+
+def fetch_feeds(urls, force=(), **options):
+    """Fetch feeds from synchronous code (the scheduler thread, Flask views); see FeedFetcher.fetch_all."""
+    return asyncio.run(FeedFetcher(**options).fetch_all(list(urls), force=set(force)))
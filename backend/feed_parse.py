@@ -0,0 +1,86 @@
+"""
+Feed parsing: feed body -> entry dicts.
+
+Kept apart from the fetching code so the parser worker processes started by
+feed_fetcher.py only import what parsing needs.
+"""
+import html
+import re
+from html.entities import html5
+
+import feedparser
+from bs4 import BeautifulSoup
+
+# -------- HTML Cleaning -------- #
+
+# Fast path: drop tags and comments with one regex and decode references with
+# html.unescape. It only runs on markup where that gives exactly what
+# BeautifulSoup's html.parser + get_text() would; anything else (script/style,
+# CDATA, unknown or unterminated references, numeric references to characters
+# html.unescape drops, NUL bytes, stray "<", ">" inside attribute values, ...)
+# goes to BeautifulSoup. test_feed_parse.py checks the two against each other.
+_MARKUP = re.compile(r'<!--(?:(?!--)[\s\S])*?-->|</?[a-zA-Z][^<>"\']*(?:(?:"[^"<>]*"|\'[^\'<>]*\')[^<>"\']*)*>')
+_RAW_TEXT = re.compile(r'<(?:script|style|xmp|iframe|noembed|noframes|noscript|plaintext|textarea|title)[\s/>]', re.I)
+_AMPERSAND = re.compile(r'&(?:#([0-9]+);|#[xX]([0-9a-fA-F]+);|([a-zA-Z][a-zA-Z0-9]*);|(?=[#a-zA-Z0-9]))')
+_WHITESPACE = re.compile(r'\s+')
+
+def _dropped_by_unescape(codepoint):
+    """Controls and noncharacters: html.unescape drops them, BeautifulSoup keeps them."""
+    return (
+        0x1 <= codepoint <= 0x8 or codepoint == 0xB or 0xE <= codepoint <= 0x1F or codepoint == 0x7F
+        or 0xFDD0 <= codepoint <= 0xFDEF or (codepoint <= 0x10FFFF and codepoint & 0xFFFE == 0xFFFE)
+    )
+
+def _fast_text(raw_html):
+    """Text of simple markup, or None if it needs a real parser."""
+    if '\x00' in raw_html or _RAW_TEXT.search(raw_html):
+        return None  # html.parser keeps a tag with a NUL in it as text
+    text = _MARKUP.sub('', raw_html)
+    if '<' in text:
+        return None
+    if '&' in text:
+        for match in _AMPERSAND.finditer(text):
+            decimal, hexadecimal, name = match.groups()
+            if match.group(0) == '&' or (name is not None and name + ';' not in html5):
+                return None
+            if decimal is not None and _dropped_by_unescape(int(decimal)):
+                return None
+            if hexadecimal is not None and _dropped_by_unescape(int(hexadecimal, 16)):
+                return None
+        text = html.unescape(text)
+    return text
+
+def clean_html(raw_html):
+    text = _fast_text(raw_html)
+    if text is None:
+        text = BeautifulSoup(raw_html, 'html.parser').get_text()
+    text = _WHITESPACE.sub(' ', text)
+    return text.strip()
+
+def clean_html_batch(raw_htmls):
+    """clean_html over a list, e.g. every description of one feed."""
+    return [clean_html(raw_html) for raw_html in raw_htmls]
+
+# -------- Feed Entries -------- #
+
+def feed_entries(feed):
+    """Turn a parsed feed into our entry dicts."""
+    entries = []
+    raw_descriptions = [
+        entry.content[0].value if "content" in entry else entry.get("summary", "")
+        for entry in feed.entries  #  feed.entries[:10] limit to 10 entries per feed (optional)
+    ]
+    for entry, description in zip(feed.entries, clean_html_batch(raw_descriptions)):
+        entries.append({
+            "title": entry.get("title", ""),
+            "link": entry.get("link", ""),
+            "published": entry.get("published", ""),
+            "description": description,
+            "source": feed.feed.get("title", ""),
+        })
+    return entries
+
+def parse_feed(content, response_headers=None):
+    """Parse a downloaded feed body; returns {"bozo": bool, "entries": [...]}, which pickles cheaply."""
+    feed = feedparser.parse(content, response_headers=response_headers or {})
+    return {"bozo": bool(feed.bozo), "entries": feed_entries(feed)}
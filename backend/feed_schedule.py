@@ -0,0 +1,138 @@
+"""
+Per-feed polling schedule.
+
+Each feed is fetched about FETCH_POLLS_PER_POST times per its average gap
+between posts, measured from the publish dates of its entries. A feed that
+has gone quiet is treated as posting no more often than its quiet spell, so
+its interval grows on its own. Intervals stay between FETCH_INTERVAL_* and
+FETCH_INTERVAL_MAX_HOURS and get +-FETCH_JITTER so feeds do not line up.
+A failed fetch doubles the interval per consecutive error, up to
+FETCH_ERROR_BACKOFF_MAX_HOURS.
+
+The schedule is kept with the rest of a feed's state in feed_state.json:
+"next_fetch_at", "fetch_interval", "publish_gap", "last_published",
+"last_changed" and "fetch_errors". news_scheduler.py looks for due feeds
+every FETCH_TICK_SECONDS and fetches only those.
+
+    python feed_schedule.py   # each feed's interval and the fetches/hour it adds up to
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from feed_state import feed_state
+from rss_config import (
+    FETCH_ERROR_BACKOFF_MAX_HOURS, FETCH_INTERVAL_HOURS, FETCH_INTERVAL_MAX_HOURS,
+    FETCH_INTERVAL_MINUTES, FETCH_POLLS_PER_POST, FETCH_TICK_SECONDS,
+)
+
+MIN_INTERVAL_SECONDS = max(FETCH_INTERVAL_HOURS * 3600 + FETCH_INTERVAL_MINUTES * 60, FETCH_TICK_SECONDS)
+MAX_INTERVAL_SECONDS = max(FETCH_INTERVAL_MAX_HOURS * 3600, MIN_INTERVAL_SECONDS)
+ERROR_BACKOFF_MAX_SECONDS = max(FETCH_ERROR_BACKOFF_MAX_HOURS * 3600, MAX_INTERVAL_SECONDS)
+FETCH_JITTER = 0.1
+_RECENT_POSTS = 20  # publish dates used for the average gap
+
+
+def published_at(value):
+    """Naive UTC datetime of an entry's "published" string (RFC 822 or ISO 8601), or None."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def publish_stats(entries, now):
+    """(average seconds between recent posts or None, newest publish date or None) of a feed's entries."""
+    dates = sorted({d for d in (published_at(entry.get("published")) for entry in entries) if d and d <= now})
+    if not dates:
+        return None, None
+    recent = dates[-_RECENT_POSTS:]
+    gap = (recent[-1] - recent[0]).total_seconds() / (len(recent) - 1) if len(recent) > 1 else None
+    return gap, recent[-1]
+
+
+def _since(timestamp, now):
+    return (now - datetime.fromisoformat(timestamp)).total_seconds() if timestamp else 0
+
+
+def base_interval(saved, now):
+    """Seconds until the next fetch of a healthy feed, before jitter."""
+    gap = saved.get("publish_gap") or MIN_INTERVAL_SECONDS * FETCH_POLLS_PER_POST
+    quiet = _since(saved.get("last_published") or saved.get("last_changed"), now)
+    return min(max(max(gap, quiet) / FETCH_POLLS_PER_POST, MIN_INTERVAL_SECONDS), MAX_INTERVAL_SECONDS)
+
+
+def schedule_after_fetch(url, result, entries=(), now=None, state=feed_state):
+    """Set a feed's next fetch from the outcome of fetching it now; returns the interval in seconds.
+
+    `entries` are the entries of a "changed" fetch; they refresh the
+    feed's publish rate.
+    """
+    now = now or datetime.utcnow()
+    saved = state.get(url)
+    fields = {}
+    if result == "changed":
+        gap, newest = publish_stats(entries, now)
+        if gap:
+            fields["publish_gap"] = round(gap)
+        if newest:
+            fields["last_published"] = newest.isoformat()
+    if result == "changed" or not saved.get("last_changed"):
+        # Stands in for last_published when entries have no dates; a first fetch counts as a change
+        fields["last_changed"] = now.isoformat()
+    interval = base_interval({**saved, **fields}, now)
+    if result == "error":
+        fields["fetch_errors"] = saved.get("fetch_errors", 0) + 1
+        interval = min(interval * 2 ** fields["fetch_errors"], ERROR_BACKOFF_MAX_SECONDS)
+    else:
+        fields["fetch_errors"] = 0
+    interval *= random.uniform(1 - FETCH_JITTER, 1 + FETCH_JITTER)
+    fields["fetch_interval"] = round(interval)
+    fields["next_fetch_at"] = (now + timedelta(seconds=interval)).isoformat()
+    state.update(url, **fields)
+    return interval
+
+
+def next_fetch_at(saved):
+    """When a feed is next due, or None for a feed never scheduled (due now)."""
+    due = saved.get("next_fetch_at")
+    if not saved.get("valid", True) and saved.get("retry_at"):
+        due = max(due or "", saved["retry_at"])  # an invalid feed also waits out its validation backoff
+    return datetime.fromisoformat(due) if due else None
+
+
+def is_due(url, now=None, state=feed_state):
+    due = next_fetch_at(state.get(url))
+    return due is None or due <= (now or datetime.utcnow())
+
+
+if __name__ == "__main__":
+    from news_ingest_service import feed_url
+    from news_scheduler import load_urls_from_file
+
+    base_urls = load_urls_from_file()
+    per_hour = 0.0
+    for base_url in base_urls:
+        url = feed_url(base_url)
+        saved = feed_state.get(url)
+        interval = saved.get("fetch_interval") or MIN_INTERVAL_SECONDS
+        per_hour += 3600 / interval
+        gap = saved.get("publish_gap")
+        due = next_fetch_at(saved)
+        print(url)
+        print(
+            f"    every {interval / 60:.1f} min"
+            f" | posts every {f'{gap / 3600:.1f} h' if gap else '?'}"
+            f" | next {due.isoformat(timespec='minutes') if due else 'now'}"
+            + (f" | {saved['fetch_errors']} errors" if saved.get("fetch_errors") else "")
+        )
+    print(f"≈ {per_hour:.1f} fetches/hour for {len(base_urls)} feeds "
+          f"(polling all of them every {FETCH_TICK_SECONDS}s: {len(base_urls) * 3600 / FETCH_TICK_SECONDS:.0f})")
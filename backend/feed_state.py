@@ -0,0 +1,103 @@
+"""
+Per-feed HTTP state for conditional RSS fetching.
+
+Kept in FEED_STATE_PATH as JSON, one entry per feed URL:
+
+    {"feeds": {"https://latamlist.com/feed/": {
+        "etag": "\"abc\"", "modified": "Tue, 06 May 2025 10:00:00 GMT",
+        "content_hash": "9f2c...", "last_fetched": "2025-05-08T00:18:43", "last_result": "not_modified"}},
+     "totals": {"not_modified": 120, "unchanged": 30, "changed": 12, "error": 1}}
+
+`last_result` is one of FETCH_RESULTS. news_ingest_service.validate_and_collect
+also keeps its verdict here: "valid", "validated_at", and for invalid feeds
+"failures" and "retry_at". The ETag and Last-Modified are sent back as
+If-None-Match / If-Modified-Since, and the hash catches servers that send the
+same body again without supporting either.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from rss_config import FEED_STATE_PATH
+
+FETCH_RESULTS = ("not_modified", "unchanged", "changed", "error")
+
+
+class FeedStateStore:
+    """Thread-safe JSON-backed map of feed URL -> cache validators, plus lifetime result totals."""
+
+    def __init__(self, path=FEED_STATE_PATH):
+        self.path = path
+        self._feeds = None
+        self._totals = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._feeds is not None:
+            return
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read feed state, starting fresh: {e}")
+        self._feeds = data.get("feeds", {})
+        self._totals = {result: 0 for result in FETCH_RESULTS}
+        self._totals.update(data.get("totals", {}))
+
+    def get(self, url):
+        """Saved state of a feed (a copy), or {} if it was never fetched."""
+        with self._lock:
+            self._load()
+            return dict(self._feeds.get(url, {}))
+
+    def record(self, url, result, **fields):
+        """Store the outcome of fetching `url`; fields with a None value are left as they were."""
+        with self._lock:
+            self._load()
+            entry = self._feeds.setdefault(url, {})
+            entry.update({k: v for k, v in fields.items() if v is not None})
+            entry["last_fetched"] = datetime.utcnow().isoformat()
+            entry["last_result"] = result
+            self._totals[result] = self._totals.get(result, 0) + 1
+
+    def update(self, url, **fields):
+        """Change stored fields of a feed without counting a fetch."""
+        with self._lock:
+            self._load()
+            self._feeds.setdefault(url, {}).update(fields)
+
+    def totals(self):
+        with self._lock:
+            self._load()
+            return dict(self._totals)
+
+    def save(self):
+        """Write the state atomically, so a crash mid-write leaves the previous file intact."""
+        with self._lock:
+            self._load()
+            data = {"feeds": self._feeds, "totals": self._totals}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def hit_rate(counts):
+    """Share of fetches that skipped parsing (304 or an identical body)."""
+    fetched = sum(counts.get(result, 0) for result in FETCH_RESULTS)
+    skipped = counts.get("not_modified", 0) + counts.get("unchanged", 0)
+    return skipped / fetched if fetched else 0.0
+
+
+def format_counts(counts):
+    return (
+        f"{counts.get('not_modified', 0)} not modified, {counts.get('unchanged', 0)} unchanged, "
+        f"{counts.get('changed', 0)} parsed, {counts.get('error', 0)} failed ({hit_rate(counts):.0%} skipped)"
+        + (f", {counts['backoff']} invalid feeds backed off" if counts.get("backoff") else "")
+    )
+
+
+feed_state = FeedStateStore()
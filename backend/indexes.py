@@ -0,0 +1,194 @@
+"""
+Index registry for the latam_news database.
+
+Every index the API relies on is declared in INDEXES. The API creates any
+missing ones at startup; the same checks are available from the CLI:
+
+    python indexes.py ensure     # create missing indexes, report unused/undeclared ones
+    python indexes.py explain    # print the query plan of each endpoint's query
+"""
+import sys
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from dates import PUBLISHED_AT_FIELD
+from feed import INGESTED_AT_FIELD
+from search import search_order, search_projection, search_sort, text_index_spec, text_query
+from stats import PROFILE_URL_FIELD, ROLLUP_COLLECTION
+from jobs import JOBS_COLLECTION
+from url_registry import KNOWN_URLS_COLLECTION
+
+
+def _text_index(name):
+    keys, options = text_index_spec(name)
+    return IndexModel(keys, **options)
+
+
+def _key_fields(key):
+    # A text index reports its text fields as _fts/_ftsx; compare the other keys only
+    return [(field, direction) for field, direction in key.items()
+            if field not in ("_fts", "_ftsx") and direction != "text"]
+
+
+def _unique_url(field):
+    # Only string URLs are constrained, so documents without one can coexist
+    return IndexModel(
+        [(field, ASCENDING)], name="url_unique", unique=True,
+        partialFilterExpression={field: {"$type": "string"}}
+    )
+
+
+_PUBLISHED_AT = IndexModel([(PUBLISHED_AT_FIELD, DESCENDING)], name="published_at_desc")
+# /stream/articles polling (keyset on ingested_at, _id) and Last-Event-ID backfill
+_INGESTED_AT = IndexModel([(INGESTED_AT_FIELD, ASCENDING), ("_id", ASCENDING)], name="ingested_at_id")
+
+# Filters end in _id so the same index also serves keyset pagination
+INDEXES = {
+    "articles": [
+        _unique_url("URL"),
+        IndexModel([("Empresa", ASCENDING), ("_id", ASCENDING)], name="empresa_id"),
+        _PUBLISHED_AT,
+        _INGESTED_AT,
+        _text_index("articles"),
+    ],
+    "media_reports": [
+        _unique_url("URL"),
+        IndexModel([("Empresa", ASCENDING), ("_id", ASCENDING)], name="empresa_id"),
+        _PUBLISHED_AT,
+        _INGESTED_AT,
+        _text_index("media_reports"),
+    ],
+    "companies": [
+        IndexModel([("Empresa protagonista (Nombre)", ASCENDING), ("_id", ASCENDING)], name="empresa_id"),
+        IndexModel([("URL de la fuente original", ASCENDING)], name="source_url"),
+        _PUBLISHED_AT,
+        _text_index("companies"),
+    ],
+    "news_company_profiles": [
+        _unique_url(PROFILE_URL_FIELD),
+        IndexModel([("category", ASCENDING), ("country", ASCENDING)], name="category_country"),
+        IndexModel([("country", ASCENDING)], name="country"),
+    ],
+    ROLLUP_COLLECTION: [
+        IndexModel([("_id.day", ASCENDING)], name="day"),
+    ],
+    JOBS_COLLECTION: [
+        # At most one queued/running job per set of crawl parameters
+        IndexModel(
+            [("active_key", ASCENDING)], name="active_key_unique", unique=True,
+            partialFilterExpression={"active_key": {"$type": "string"}}
+        ),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+    ],
+    KNOWN_URLS_COLLECTION: [
+        IndexModel([("domain", ASCENDING), ("_id", ASCENDING)], name="domain_id"),
+    ],
+}
+
+def _search(name, keyword, sort="score", date_from=None):
+    # The filter and sort /search_websites/ sends to one collection
+    return name, text_query(name, keyword, date_from), search_sort(name, search_order(keyword, sort))
+
+
+# Representative query of each endpoint: (collection, filter, sort)
+ENDPOINT_QUERIES = {
+    "GET /articles/": ("articles", {}, [("_id", ASCENDING)]),
+    "GET /articles/?empresa=": ("articles", {"Empresa": "Example"}, [("_id", ASCENDING)]),
+    "GET /media_reports/?empresa=": ("media_reports", {"Empresa": "Example"}, [("_id", ASCENDING)]),
+    "GET /companies/?empresa=": ("companies", {"Empresa protagonista (Nombre)": "Example"}, [("_id", ASCENDING)]),
+    "GET /news_company_profiles/?category=&country=": (
+        "news_company_profiles", {"category": {"$in": ["AI"]}, "country": {"$in": ["Chile"]}}, None
+    ),
+    "GET /news_company_profiles/?country=": ("news_company_profiles", {"country": {"$in": ["Chile"]}}, None),
+    "GET /website_links/?domain=": (KNOWN_URLS_COLLECTION, {"domain": "contxto.com"}, [("_id", ASCENDING)]),
+    "GET /stats/facets?date_from=": (ROLLUP_COLLECTION, {"_id.day": {"$gte": datetime(2025, 1, 1)}}, None),
+    "GET /stream/articles (poll)": ("articles", {INGESTED_AT_FIELD: {"$gt": datetime(2025, 1, 1)}}, [(INGESTED_AT_FIELD, ASCENDING), ("_id", ASCENDING)]),
+    "GET /search_websites/ (articles)": _search("articles", "fintech"),
+    "GET /search_websites/ (companies)": _search("companies", "fintech"),
+    "GET /search_websites/ (media_reports)": _search("media_reports", "fintech"),
+    "GET /search_websites/?date_from= (articles)": _search("articles", "fintech", date_from="2025-01-01"),
+    "GET /search_websites/?sort=date&date_from= (articles)": _search("articles", "fintech", "date", "2025-01-01"),
+    "GET /search_websites/?date_from= without keyword (articles)": _search("articles", None, date_from="2025-01-01"),
+}
+
+
+def ensure_indexes(db, report_unused=True):
+    """Create missing registry indexes and print anything missing, conflicting, undeclared or unused."""
+    for name, models in INDEXES.items():
+        collection = db[name]
+        existing = collection.index_information()
+        declared = set()
+
+        for model in models:
+            doc = model.document
+            index_name = doc["name"]
+            declared.add(index_name)
+            if index_name in existing:
+                if _key_fields(dict(existing[index_name]["key"])) != _key_fields(doc["key"]):
+                    print(f"⚠️ {name}.{index_name} exists with different keys: {existing[index_name]['key']} "
+                          f"(drop it and run `python indexes.py ensure` to rebuild)")
+                continue
+            try:
+                collection.create_indexes([model])
+                print(f"➕ Created index {name}.{index_name}")
+            except OperationFailure as e:
+                # e.g. duplicate URLs block a unique index, or another text index exists
+                print(f"❌ Could not create index {name}.{index_name}: {e}")
+
+        for index_name in existing:
+            if index_name != "_id_" and index_name not in declared:
+                print(f"ℹ️ {name}.{index_name} is not declared in the index registry")
+
+        if report_unused:
+            try:
+                for stats in collection.aggregate([{"$indexStats": {}}]):
+                    if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                        print(f"💤 {name}.{stats['name']} has not been used since {stats['accesses']['since']}")
+            except OperationFailure as e:
+                print(f"Could not read index usage for {name}: {e}")
+
+
+def _plan_stages(plan):
+    """Flatten a winning plan into 'STAGE(index)' strings, outermost first."""
+    stages = []
+    plan = plan.get("queryPlan", plan)  # slot-based engine wraps the classic plan
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def explain_endpoints(db):
+    """Print the winning plan and execution stats for each endpoint's query."""
+    for endpoint, (name, query, sort) in ENDPOINT_QUERIES.items():
+        keyword = query.get("$text", {}).get("$search")
+        cursor = db[name].find(query, search_projection(keyword)).limit(50)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()
+        winning = plan["queryPlanner"]["winningPlan"]
+        stats = plan.get("executionStats", {})
+        print(endpoint)
+        print(f"  plan: {' <- '.join(_plan_stages(winning))}")
+        print(
+            f"  returned={stats.get('nReturned')} keys_examined={stats.get('totalKeysExamined')} "
+            f"docs_examined={stats.get('totalDocsExamined')} time_ms={stats.get('executionTimeMillis')}"
+        )
+
+
+if __name__ == "__main__":
+    from db import db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    if command == "ensure":
+        ensure_indexes(db)
+    elif command == "explain":
+        explain_endpoints(db)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,323 @@
+"""
+Background crawl + enrichment jobs for /run_spider/.
+
+A job runs `scrapy crawl news_spider` and then enrich_articles.py as asyncio
+subprocesses, so no request or worker thread waits on them. At most
+SPIDER_MAX_CONCURRENT_JOBS run at once across all server workers: a job
+first claims one of that many slot documents in spider_slots, a lease that
+its worker renews while the job runs and that expires if the worker dies.
+The rest wait, in order within each worker. Asking for a crawl whose keywords and URLs match a queued or running
+job returns that job instead of starting another (enforced by a unique
+index, so it also holds across server workers). A job whose worker died
+(its slot lease expired, or its hostname and pid now belong to a process
+with a different BOOT_ID, as after a container restart) is closed as
+"interrupted" at startup, or when an identical crawl is asked for.
+
+Output of both steps is appended to JOB_LOG_DIR/<job id>.log as it arrives
+and can be followed with tail_log(). Job documents are kept in the
+spider_jobs collection:
+
+    {"_id": "3f2a...", "keywords": [...], "urls": [...], "frequency": "immediate",
+     "status": "queued" | "running" | "succeeded" | "failed" | "cancelled" | "interrupted",
+     "step": "crawl" | "enrich", "returncode": 0, "created_at": ..., "started_at": ..., "finished_at": ...}
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from db import get_async_db
+
+JOBS_COLLECTION = "spider_jobs"
+SLOTS_COLLECTION = "spider_slots"
+ACTIVE_STATUSES = ("queued", "running")
+
+# The spider writes lcscraper/output.csv and enrichment reads it back, so
+# concurrent runs would overwrite each other's output unless that changes.
+SPIDER_MAX_CONCURRENT_JOBS = int(os.environ.get("SPIDER_MAX_CONCURRENT_JOBS", 1))
+SPIDER_SLOT_LEASE_SECONDS = 60  # renewed every third of this while the job runs
+SPIDER_SLOT_POLL_SECONDS = 2  # how often a waiting job retries for a free slot
+BOOT_ID = uuid.uuid4().hex  # tells this process apart from an earlier one with the same hostname and pid
+SCRAPY_PATH = os.environ.get("SCRAPY_PATH", "/home/dog/miniconda3/bin/scrapy")  # Run `which scrapy` to confirm this path
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, ".."))
+SCRAPY_PROJECT_DIR = os.path.join(PROJECT_ROOT, "lcscraper")
+ENRICH_SCRIPT_PATH = os.path.join(SCRAPY_PROJECT_DIR, "enrich_articles.py")
+JOB_LOG_DIR = os.environ.get("JOB_LOG_DIR", os.path.join(BACKEND_DIR, "job_logs"))
+
+
+def spider_command(keywords=None, urls=None):
+    """Build the scrapy command line for a crawl."""
+    command = [SCRAPY_PATH, "crawl", "news_spider"]
+    if keywords:
+        command += ["-a", f"keywords={','.join(keywords)}"]
+    if urls:
+        command += ["-a", f"urls={','.join(urls)}"]
+    command += ["-o", "output.csv"]
+    return command
+
+
+def active_key(keywords, urls):
+    """Identify a crawl by its parameters, ignoring their order."""
+    return json.dumps([sorted(keywords or []), sorted(urls or [])])
+
+
+def log_path(job_id):
+    return os.path.join(JOB_LOG_DIR, f"{job_id}.log")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    """Queues, runs and tracks the spider jobs started by this API process."""
+
+    def __init__(self, max_concurrent=SPIDER_MAX_CONCURRENT_JOBS):
+        self.max_concurrent = max_concurrent
+        self.hostname = socket.gethostname()
+        self._claim_lock = None
+        self._running = {}  # job id -> {"task", "process", "changed", "cancelled"}
+
+    def _collection(self):
+        return get_async_db()[JOBS_COLLECTION]
+
+    def _slots(self):
+        return get_async_db()[SLOTS_COLLECTION]
+
+    async def start(self):
+        """Create loop-bound state and close out jobs whose worker has died."""
+        self._claim_lock = asyncio.Lock()
+        os.makedirs(JOB_LOG_DIR, exist_ok=True)
+        try:
+            async for job in self._collection().find({"status": {"$in": list(ACTIVE_STATUSES)}}):
+                if await self._is_stale(job):
+                    await self._finish(job["_id"], "interrupted", None)
+        except PyMongoError as e:
+            print(f"⚠️ Could not check for interrupted spider jobs: {e}")
+
+    async def _is_stale(self, job):
+        """True if the worker of a queued or running job is known to be gone."""
+        if job["_id"] in self._running:
+            return False
+        if job.get("hostname") == self.hostname:
+            if job.get("pid") == os.getpid():
+                return job.get("boot_id") != BOOT_ID  # same pid, but an earlier process
+            if job.get("pid") and not _pid_alive(job["pid"]):
+                return True
+        if job["status"] == "running":
+            # A running job holds a slot whose lease its worker keeps renewing
+            lease = await self._slots().find_one({"job_id": job["_id"], "expires_at": {"$gt": _now()}})
+            return lease is None
+        return False
+
+    async def stop(self):
+        """Cancel this process's jobs; they are recorded as cancelled."""
+        for running in self._running.values():
+            running["cancelled"] = True
+            if running["process"] and running["process"].returncode is None:
+                running["process"].terminate()
+            running["task"].cancel()
+        await asyncio.gather(*(r["task"] for r in self._running.values()), return_exceptions=True)
+
+    async def submit(self, keywords=None, urls=None, frequency="immediate"):
+        """Queue a crawl and return (job, created); an identical queued or running job is returned instead."""
+        key = active_key(keywords, urls)
+        job = {
+            "_id": uuid.uuid4().hex,
+            "keywords": keywords or [],
+            "urls": urls or [],
+            "frequency": frequency,
+            "status": "queued",
+            "step": None,
+            "returncode": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "hostname": self.hostname,
+            "pid": os.getpid(),
+            "boot_id": BOOT_ID,
+            "active_key": key,  # unset when the job finishes
+        }
+        for _ in range(3):
+            try:
+                await self._collection().insert_one(job)
+                break
+            except DuplicateKeyError:
+                existing = await self._collection().find_one({"active_key": key})
+                if existing and await self._is_stale(existing):
+                    await self._finish(existing["_id"], "interrupted", None)
+                elif existing:
+                    return existing, False
+                # it finished in between; try again
+        self._running[job["_id"]] = {"process": None, "changed": asyncio.Event(), "cancelled": False}
+        self._running[job["_id"]]["task"] = asyncio.create_task(self._run(job["_id"], keywords, urls))
+        return job, True
+
+    async def get(self, job_id):
+        return await self._collection().find_one({"_id": job_id})
+
+    async def recent(self, limit=50, status=None):
+        """Most recent jobs first."""
+        query = {"status": status} if status else {}
+        return await self._collection().find(query).sort("created_at", -1).limit(limit).to_list(length=None)
+
+    async def _update(self, job_id, **fields):
+        await self._collection().update_one({"_id": job_id}, {"$set": fields})
+
+    async def _finish(self, job_id, status, returncode):
+        await self._collection().update_one(
+            {"_id": job_id},
+            {"$set": {"status": status, "returncode": returncode, "finished_at": _now()}, "$unset": {"active_key": ""}},
+        )
+
+    # ---------- Run slots ----------
+
+    async def _try_claim(self, job_id):
+        """Take a free or expired slot for the job; returns its number, or None if all are held."""
+        now = _now()
+        for slot in range(self.max_concurrent):
+            try:
+                # Matches a free or expired slot, or inserts a missing one; a held slot makes the upsert collide
+                await self._slots().update_one(
+                    {"_id": slot, "$or": [{"job_id": None}, {"expires_at": {"$lt": now}}]},
+                    {"$set": {
+                        "job_id": job_id, "hostname": self.hostname, "pid": os.getpid(),
+                        "expires_at": now + timedelta(seconds=SPIDER_SLOT_LEASE_SECONDS),
+                    }},
+                    upsert=True,
+                )
+                return slot
+            except DuplicateKeyError:
+                continue
+        return None
+
+    async def _claim_slot(self, job_id):
+        """Wait for a run slot; this worker's jobs ask one at a time, oldest first."""
+        async with self._claim_lock:
+            while True:
+                slot = await self._try_claim(job_id)
+                if slot is not None:
+                    return slot
+                await asyncio.sleep(SPIDER_SLOT_POLL_SECONDS)
+
+    async def _renew_slot(self, slot, job_id):
+        """Keep extending the slot's lease until cancelled."""
+        while True:
+            await asyncio.sleep(SPIDER_SLOT_LEASE_SECONDS / 3)
+            try:
+                await self._slots().update_one(
+                    {"_id": slot, "job_id": job_id},
+                    {"$set": {"expires_at": _now() + timedelta(seconds=SPIDER_SLOT_LEASE_SECONDS)}},
+                )
+            except PyMongoError as e:
+                print(f"⚠️ Could not renew run slot {slot} of job {job_id}: {e}")
+
+    async def _release_slot(self, slot, job_id):
+        await self._slots().update_one({"_id": slot, "job_id": job_id}, {"$set": {"job_id": None}})
+
+    # ---------- Running ----------
+
+    async def _run_step(self, job_id, step, command, log):
+        """Run one subprocess, appending its output to the job log; returns its exit code."""
+        running = self._running[job_id]
+        await self._update(job_id, step=step)
+        log.write(f"$ {' '.join(command)}\n".encode())
+        log.flush()
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=SCRAPY_PROJECT_DIR, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        running["process"] = process
+        # Copy in chunks rather than lines: Scrapy item dumps can exceed any line length limit
+        while chunk := await process.stdout.read(65536):
+            log.write(chunk)
+            log.flush()
+            running["changed"].set()
+        return await process.wait()
+
+    async def _run(self, job_id, keywords, urls):
+        running = self._running[job_id]
+        status, returncode = "failed", None
+        slot, renewer = None, None
+        try:
+            slot = await self._claim_slot(job_id)
+            renewer = asyncio.create_task(self._renew_slot(slot, job_id))
+            await self._update(job_id, status="running", started_at=_now())
+            print(f"🕷️ Job {job_id} started in slot {slot}: keywords={keywords} urls={urls}")
+            with open(log_path(job_id), "ab") as log:
+                returncode = await self._run_step(job_id, "crawl", spider_command(keywords, urls), log)
+                if returncode == 0:
+                    returncode = await self._run_step(job_id, "enrich", ["python3", ENRICH_SCRIPT_PATH], log)
+            status = "succeeded" if returncode == 0 else "failed"
+        except asyncio.CancelledError:
+            pass
+        except OSError as e:  # e.g. scrapy is not at SCRAPY_PATH
+            with open(log_path(job_id), "ab") as log:
+                log.write(f"{e}\n".encode())
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+            if slot is not None:
+                try:
+                    await self._release_slot(slot, job_id)
+                except PyMongoError as e:
+                    # The lease expires on its own; the job must still be finished
+                    print(f"⚠️ Could not release run slot {slot} of job {job_id}: {e}")
+            if running["cancelled"]:
+                status = "cancelled"
+            await self._finish(job_id, status, returncode)
+            print(f"🏁 Job {job_id} {status} (exit code {returncode})")
+            del self._running[job_id]
+            running["changed"].set()
+
+    async def _is_active(self, job_id):
+        if job_id in self._running:
+            return True
+        job = await self._collection().find_one({"_id": job_id}, {"status": 1})  # started by another worker
+        return bool(job) and job["status"] in ACTIVE_STATUSES
+
+    async def tail_log(self, job_id, poll_seconds=1.0):
+        """Yield the job's log line by line, following it until the job has finished."""
+        path = log_path(job_id)
+        offset = 0
+        while True:
+            running = self._running.get(job_id)
+            if running:
+                running["changed"].clear()
+            active = await self._is_active(job_id)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+                # Only hand out complete lines; a partial one is read again next time
+                end = chunk.rfind(b"\n") + 1
+                for line in chunk[:end].splitlines():
+                    yield line.decode("utf-8", errors="replace")
+                offset += end
+            if not active:
+                return
+            if running:
+                try:
+                    await asyncio.wait_for(running["changed"].wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(poll_seconds)
+
+
+job_manager = JobManager()
@@ -1,20 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Query
 from typing import Optional, List
-from fastapi.responses import JSONResponse
-from db import articles_collection, companies_collection, media_reports_collection
-import subprocess
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from db import close_async_client, db, ping_async
+from dates import date_range
+from indexes import ensure_indexes
+from cache import cached, response_cache
+from responses import MongoJSONResponse, conditional, dumps
+from jobs import job_manager
+from feed import FEED_COLLECTIONS, event_id, documents_since, feed, parse_event_id
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from stats import FACET_FIELDS, TIMESERIES_INTERVALS
+from suggest import DEFAULT_SUGGEST_LIMIT, MAX_SUGGEST_LIMIT
+from search import (
+    DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE, DEFAULT_COLLECTION_LIMIT, MAX_COLLECTION_LIMIT,
+    DEFAULT_TOTAL_LIMIT, MAX_TOTAL_LIMIT
+)
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import asyncio
+import json
 import os
 from fastapi import Body
 
-from crud import (
-    create_article, get_article, get_all_articles, get_companies_by_empresa, update_article, delete_article,
-    create_media_report, get_media_report, get_all_media_reports, update_media_report, delete_media_report,
-    create_company, get_company, get_all_companies, update_company, delete_company, search_all_collections,get_all_spider_urls, create_spider_url, delete_spider_url
+from async_crud import (
+    create_article, get_article, get_all_articles, get_articles_by_empresa, get_companies_by_empresa, update_article, delete_article,
+    create_media_report, get_media_report, get_all_media_reports, get_media_reports_by_empresa, update_media_report, delete_media_report,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, create_company, get_company, get_all_companies, update_company, delete_company, search_all_collections,get_all_spider_urls, create_spider_url, delete_spider_url,
+    EXPORT_COLLECTIONS, export_collection_ndjson, search_all_collections_ndjson, get_known_url,
+    BULK_COLLECTIONS, BULK_BATCH_SIZE, bulk_write_documents, get_stats_facets, get_stats_timeseries, suggest_companies
 )
 
-app = FastAPI()
+app = FastAPI(default_response_class=MongoJSONResponse)
 
 # Allow requests from frontend (localhost:5173)
 app.add_middleware(
@@ -23,95 +41,187 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Latency, status and response size per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(DuplicateKeyError)
+async def duplicate_key_handler(request, exc):
+    # Raised by the unique URL indexes
+    return JSONResponse(status_code=409, content={"detail": "A document with this URL already exists"})
+
+# serve.py checks indexes once before starting workers and sets this to 0
+INDEX_CHECK_ON_STARTUP = os.environ.get("INDEX_CHECK_ON_STARTUP", "1") != "0"
+READY_TIMEOUT_SECONDS = 2
+
+def check_indexes():
+    try:
+        ensure_indexes(db, report_unused=False)  # `python indexes.py ensure` reports unused ones
+    except PyMongoError as e:
+        print(f"❌ Index check failed: {e}")
+
+@app.on_event("startup")
+async def startup():
+    response_cache.load()
+    await job_manager.start()
+    app.state.index_check = None
+    if INDEX_CHECK_ON_STARTUP:
+        # Index builds go through the sync client, off the event loop, and do not hold up startup
+        app.state.index_check = asyncio.create_task(asyncio.to_thread(check_indexes))
+
+@app.on_event("shutdown")
+async def shutdown():
+    response_cache.save()
+    await job_manager.stop()
+    await feed.stop()
+    await close_async_client()
+
+# ----------- Health Endpoints -----------
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: the startup index check has finished and MongoDB answers a ping.
+    """
+    index_check = app.state.index_check
+    if index_check is not None and not index_check.done():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        await asyncio.wait_for(ping_async(), READY_TIMEOUT_SECONDS)
+    except (PyMongoError, asyncio.TimeoutError) as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e) or "MongoDB ping timed out"})
+    return {"status": "ready"}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics for this process: request latency and size per route,
+    MongoDB command time and documents returned per route, and cache counters.
+    """
+    cache = response_cache.stats()
+    return PlainTextResponse(metrics_registry.render([
+        ("response_cache_hits_total", "Response cache hits.", "counter", cache["hits"]),
+        ("response_cache_misses_total", "Response cache misses.", "counter", cache["misses"]),
+        ("response_cache_entries", "Entries in the response cache.", "gauge", cache["entries"]),
+    ]), media_type=METRICS_CONTENT_TYPE)
+
+# ----------- Pagination -----------
+async def page_response(fetch_page, *args, limit=DEFAULT_PAGE_SIZE, after=None):
+    """Run a crud page query and wrap it as {"items": [...], "next_cursor": ...}."""
+    try:
+        items, next_cursor = await fetch_page(*args, limit=limit, after=after)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return MongoJSONResponse({"items": items, "next_cursor": next_cursor})
+
 # ----------- Articles Endpoints -----------
 @app.post("/articles/")
-def create_article_endpoint(data: dict):
-    article_id = create_article(data)
+async def create_article_endpoint(data: dict):
+    article_id = await create_article(data)
     return {"inserted_id": article_id}
 
 @app.get("/articles/{article_id}")
-def get_article_endpoint(article_id: str):
-    article = get_article(article_id)
+async def get_article_endpoint(article_id: str):
+    article = await get_article(article_id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
-    article["_id"] = str(article["_id"])
-    return article
+    return MongoJSONResponse(article)
 
 @app.get("/articles/")
-def get_all_articles_endpoint():
-    articles = get_all_articles()
-    for a in articles:
-        a["_id"] = str(a["_id"])
-    return articles
+@conditional("articles")
+async def get_all_articles_endpoint(
+    empresa: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    if empresa:
+        return await page_response(get_articles_by_empresa, empresa, limit=limit, after=after)
+    return await page_response(get_all_articles, limit=limit, after=after)
 
 @app.put("/articles/{article_id}")
-def update_article_endpoint(article_id: str, data: dict):
-    updated = update_article(article_id, data)
+async def update_article_endpoint(article_id: str, data: dict):
+    updated = await update_article(article_id, data)
     if not updated:
         raise HTTPException(status_code=404, detail="Article not found or not updated")
     return {"updated": updated}
 
 @app.delete("/articles/{article_id}")
-def delete_article_endpoint(article_id: str):
-    deleted = delete_article(article_id)
+async def delete_article_endpoint(article_id: str):
+    deleted = await delete_article(article_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Article not found or not deleted")
     return {"deleted": deleted}
 
 # ----------- Media Reports Endpoints -----------
 @app.post("/media_reports/")
-def create_media_report_endpoint(data: dict):
-    report_id = create_media_report(data)
+async def create_media_report_endpoint(data: dict):
+    report_id = await create_media_report(data)
     return {"inserted_id": report_id}
 
 @app.get("/media_reports/{report_id}")
-def get_media_report_endpoint(report_id: str):
-    report = get_media_report(report_id)
+async def get_media_report_endpoint(report_id: str):
+    report = await get_media_report(report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Media report not found")
-    report["_id"] = str(report["_id"])
-    return report
+    return MongoJSONResponse(report)
 
 @app.get("/media_reports/")
-def get_media_reports(empresa: Optional[str] = Query(None)):
+@conditional("media_reports")
+async def get_media_reports(
+    empresa: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
     if empresa:
-        results = list(media_reports_collection.find({"Empresa": empresa}))
-    else:
-        results = list(media_reports_collection.find())
-    for r in results:
-        r["_id"] = str(r["_id"])
-    return results
+        return await page_response(get_media_reports_by_empresa, empresa, limit=limit, after=after)
+    return await page_response(get_all_media_reports, limit=limit, after=after)
 
 
 @app.put("/media_reports/{report_id}")
-def update_media_report_endpoint(report_id: str, data: dict):
-    updated = update_media_report(report_id, data)
+async def update_media_report_endpoint(report_id: str, data: dict):
+    updated = await update_media_report(report_id, data)
     if not updated:
         raise HTTPException(status_code=404, detail="Media report not found or not updated")
     return {"updated": updated}
 
 @app.delete("/media_reports/{report_id}")
-def delete_media_report_endpoint(report_id: str):
-    deleted = delete_media_report(report_id)
+async def delete_media_report_endpoint(report_id: str):
+    deleted = await delete_media_report(report_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Media report not found or not deleted")
     return {"deleted": deleted}
 
 # ----------- Companies Endpoints -----------
 @app.post("/companies/")
-def create_company_endpoint(data: dict):
-    company_id = create_company(data)
+async def create_company_endpoint(data: dict):
+    company_id = await create_company(data)
     return {"inserted_id": company_id}
 
+# Declared before /companies/{company_id} so "suggest" is not taken for an id
+@app.get("/companies/suggest")
+async def suggest_companies_endpoint(
+    q: str = Query(..., min_length=1, description="Start of a company name, or of any word in it"),
+    limit: int = Query(DEFAULT_SUGGEST_LIMIT, ge=1, le=MAX_SUGGEST_LIMIT)
+):
+    """
+    Autocomplete company names, ignoring case and accents.
+    """
+    return {"items": await suggest_companies(q, limit)}
+
 @app.get("/companies/{company_id}")
-def get_company_endpoint(company_id: str):
-    company = get_company(company_id)
+async def get_company_endpoint(company_id: str):
+    company = await get_company(company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    company["_id"] = str(company["_id"])
-    return company
+    return MongoJSONResponse(company)
 
 # @app.get("/companies/")
 # def get_all_companies_endpoint():
@@ -121,193 +231,358 @@ def get_company_endpoint(company_id: str):
 #     return companies
 
 @app.get("/companies/")
-def get_companies_endpoint(empresa: Optional[str] = Query(None)):
+@conditional("companies")
+@cached("companies", tags=["companies"])
+async def get_companies_endpoint(
+    empresa: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
     if empresa:
-        companies = get_companies_by_empresa(empresa)
+        companies = await page_response(get_companies_by_empresa, empresa, limit=limit, after=after)
     else:
-        companies = get_all_companies()
-    for c in companies:
-        c["_id"] = str(c["_id"])
-    print(f"Queried companies for empresa='{empresa}': {companies}")
+        companies = await page_response(get_all_companies, limit=limit, after=after)
     return companies
 
 @app.put("/companies/{company_id}")
-def update_company_endpoint(company_id: str, data: dict):
-    updated = update_company(company_id, data)
+async def update_company_endpoint(company_id: str, data: dict):
+    updated = await update_company(company_id, data)
     if not updated:
         raise HTTPException(status_code=404, detail="Company not found or not updated")
     return {"updated": updated}
 
 @app.delete("/companies/{company_id}")
-def delete_company_endpoint(company_id: str):
-    deleted = delete_company(company_id)
+async def delete_company_endpoint(company_id: str):
+    deleted = await delete_company(company_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Company not found or not deleted")
     return {"deleted": deleted}
 
 
+# ----------- Bulk Endpoints -----------
+async def ndjson_batches(stream, batch_size):
+    """Parse an NDJSON request body as it arrives, yielding lists of up to batch_size items.
+
+    Lines that are not valid JSON are yielded as None so they still get a result.
+    """
+    buffer = b""
+    batch = []
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                batch.append(None)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if buffer.strip():
+        try:
+            batch.append(json.loads(buffer))
+        except ValueError:
+            batch.append(None)
+    if batch:
+        yield batch
+
+@app.post("/{collection}/bulk")
+async def bulk_write_endpoint(
+    collection: str,
+    request: Request,
+    upsert: bool = Query(False, description="Match on URL and update existing documents instead of inserting")
+):
+    """
+    Insert (or upsert by URL) many articles, media_reports, companies or news_company_profiles at once.
+    Accepts a JSON array, or NDJSON with Content-Type application/x-ndjson.
+    """
+    if collection not in BULK_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+
+    results = []
+    if "ndjson" in request.headers.get("content-type", ""):
+        async for batch in ndjson_batches(request.stream(), BULK_BATCH_SIZE):
+            results += await bulk_write_documents(collection, batch, upsert, offset=len(results))
+    else:
+        try:
+            docs = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(docs, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for start in range(0, len(docs), BULK_BATCH_SIZE):
+            results += await bulk_write_documents(collection, docs[start:start + BULK_BATCH_SIZE], upsert, offset=start)
+
+    counts = {"inserted": 0, "updated": 0, "error": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    return {"inserted": counts["inserted"], "updated": counts["updated"], "errors": counts["error"], "results": results}
+
+
 @app.get("/search_websites/")
-def search_websites_endpoint(
-    keyword: str = Query(..., description="Keyword to search for"),
-    date_from: str = Query(None, description="Start date (YYYY-MM-DD)"),
-    date_to: str = Query(None, description="End date (YYYY-MM-DD)")
+async def search_websites_endpoint(
+    keyword: Optional[str] = Query(None, description="Keyword to search for; without one, the date range newest first"),
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD), inclusive"),
+    page: int = Query(1, ge=1, le=MAX_TOTAL_LIMIT, description="Pages past `limit` results are rejected"),
+    page_size: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    sort: str = Query("score", pattern="^(score|date)$", description="Order by relevance or newest first"),
+    limit: int = Query(DEFAULT_TOTAL_LIMIT, ge=1, le=MAX_TOTAL_LIMIT, description="Max merged results"),
+    per_collection_limit: int = Query(DEFAULT_COLLECTION_LIMIT, ge=1, le=MAX_COLLECTION_LIMIT),
+    stream: bool = Query(False, description="Stream up to `limit` results as NDJSON instead of one page")
 ):
-    results = search_all_collections(keyword, date_from, date_to)
-    return JSONResponse(content=results)
+    if stream:
+        try:
+            date_range(date_from, date_to)  # reject bad dates before the response starts
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return StreamingResponse(
+            search_all_collections_ndjson(keyword, date_from, date_to, sort, limit, per_collection_limit),
+            media_type="application/x-ndjson"
+        )
+    try:
+        results = await search_all_collections(keyword, date_from, date_to, page, page_size, sort, limit, per_collection_limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MongoJSONResponse(results)
 
 @app.get("/website_links/")
-def get_website_links():
-    # Collect unique URLs from all collections
-    article_links = set(
-        a.get("URL") for a in articles_collection.find({"URL": {"$exists": True, "$ne": ""}}, {"URL": 1})
-    )
-    company_links = set(
-        c.get("URL de la fuente original") for c in companies_collection.find({"URL de la fuente original": {"$exists": True, "$ne": ""}}, {"URL de la fuente original": 1})
-    )
-    media_links = set(
-        m.get("URL") for m in media_reports_collection.find({"URL": {"$exists": True, "$ne": ""}}, {"URL": 1})
-    )
-    all_links = list(article_links | company_links | media_links)
-    all_links = [link for link in all_links if link]  # Remove None/empty
-    return all_links
+@conditional("articles", "companies", "media_reports")
+@cached("website_links", tags=["articles", "companies", "media_reports"])
+async def get_website_links(
+    domain: Optional[str] = Query(None, description="Only URLs on this host, e.g. contxto.com"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Page through every source URL stored in articles, companies and media_reports.
+    """
+    from async_crud import get_website_links
+    links, next_cursor = await get_website_links(domain, limit=limit, after=after)
+    return {"items": [link["_id"] for link in links], "next_cursor": next_cursor}
+
+@app.get("/website_links/exists")
+async def website_link_exists(url: str = Query(..., description="URL to look up")):
+    """
+    Tell whether a URL is already stored, and in which collections.
+    """
+    known = await get_known_url(url)
+    return {"url": url, "known": known is not None, "sources": known["sources"] if known else []}
 
 
 
 # --- News Company Profiles Endpoints ---
 
 @app.get("/news_company_profiles/")
-def get_news_company_profiles(
+@conditional("news_company_profiles")
+@cached("news_company_profiles", tags=["news_company_profiles"])
+async def get_news_company_profiles(
     category: Optional[List[str]] = Query(None),
     country: Optional[List[str]] = Query(None)
 ):
     """
     Get all news company profiles, or filter by one or more categories and/or countries.
     """
-    from crud import get_news_company_profiles
-    results = get_news_company_profiles(category=category, country=country)
-    for r in results:
-        r["_id"] = str(r["_id"])
-    return results
+    from async_crud import get_news_company_profiles
+    results = await get_news_company_profiles(category=category, country=country)
+    return MongoJSONResponse(results)
 
 @app.get("/news_company_profiles/all")
-def get_all_news_company_profiles():
+@conditional("news_company_profiles")
+@cached("news_company_profiles_all", tags=["news_company_profiles"])
+async def get_all_news_company_profiles():
     """
     Get all news company profiles (no filters).
     """
-    from crud import get_all_news_company_profiles
-    results = get_all_news_company_profiles()
-    for r in results:
-        r["_id"] = str(r["_id"])
-    return results
+    from async_crud import get_all_news_company_profiles
+    results = await get_all_news_company_profiles()
+    return MongoJSONResponse(results)
+
+
+# --- Dashboard Stats Endpoints ---
+
+@app.get("/stats/facets")
+@conditional("news_company_profiles")
+@cached("stats_facets", tags=["news_company_profiles"])
+async def stats_facets(
+    category: Optional[List[str]] = Query(None),
+    country: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None),
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD), inclusive")
+):
+    """
+    Count news company profiles per category, country and sentiment.
+    """
+    try:
+        return await get_stats_facets(category, country, sentiment, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/stats/timeseries")
+@conditional("news_company_profiles")
+@cached("stats_timeseries", tags=["news_company_profiles"])
+async def stats_timeseries(
+    interval: str = Query("day", pattern=f"^({'|'.join(TIMESERIES_INTERVALS)})$"),
+    by: Optional[str] = Query(None, pattern=f"^({'|'.join(FACET_FIELDS)})$", description="One series per value of this field"),
+    category: Optional[List[str]] = Query(None),
+    country: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None),
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD), inclusive")
+):
+    """
+    Count news company profiles per day, week or month of publication.
+    """
+    try:
+        result = await get_stats_timeseries(interval, by, category, country, sentiment, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MongoJSONResponse(result)
+
+
+# --- Cache Endpoints ---
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters of the in-process response cache.
+    """
+    return response_cache.stats()
 
-@app.post("/run_spider/")
-def run_spider(
+
+# --- Export Endpoints ---
+
+@app.get("/export/{collection}")
+async def export_collection_endpoint(collection: str):
+    """
+    Stream a whole collection (articles, media_reports, news_company_profiles) as NDJSON.
+    """
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    return StreamingResponse(
+        export_collection_ndjson(collection),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection}.ndjson"'}
+    )
+
+
+@app.post("/run_spider/", status_code=202)
+async def run_spider(
     keywords: Optional[List[str]] = Query(None),
     urls: Optional[List[str]] = Query(None),
     frequency: Optional[str] = Query("immediate")
 ):
     """
-    Trigger the Scrapy spider with optional keywords, URLs, and frequency.
-    Outputs results to output.csv, then runs enrich_articles.py.
+    Queue the Scrapy spider with optional keywords, URLs, and frequency, followed by enrich_articles.py.
+    Returns the job at once; follow it at /jobs/{job_id} and /jobs/{job_id}/logs.
+    If the same crawl is already queued or running, that job is returned instead.
     """
+    job, created = await job_manager.submit(keywords, urls, frequency)
+    return MongoJSONResponse(
+        status_code=202 if created else 200,
+        content={"job_id": job["_id"], "status": job["status"], "duplicate": not created}
+    )
 
-    # ====== Dynamic path detection ======
-
-    # Find backend dir
-    BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
-    # Go up to project root (latam-connect/)
-    PROJECT_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, ".."))
-    # Scrapy project is at latam-connect/lcscraper
-    SCRAPY_PROJECT_DIR = os.path.join(PROJECT_ROOT, "lcscraper")
-    # Enrichment script is at lcscraper/enrich_articles.py
-    ENRICH_SCRIPT_PATH = os.path.join(SCRAPY_PROJECT_DIR, "enrich_articles.py")
+# ----------- Spider Jobs -----------
+@app.get("/jobs/")
+async def list_jobs(
+    status: Optional[str] = Query(None, description="queued, running, succeeded, failed, cancelled or interrupted"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Spider job history, most recent first.
+    """
+    return MongoJSONResponse(await job_manager.recent(limit, status))
 
-    # Full path to scrapy binary
-    SCRAPY_PATH = "/home/dog/miniconda3/bin/scrapy"  # Run `which scrapy` to confirm this path
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return MongoJSONResponse(job)
 
-    # ====== Debug print ======
-    print(f"SCRAPY_PROJECT_DIR={SCRAPY_PROJECT_DIR}")
-    print(f"SCRAPY_PATH={SCRAPY_PATH}")
-    print(f"ENRICH_SCRIPT_PATH={ENRICH_SCRIPT_PATH}")
+@app.get("/jobs/{job_id}/logs")
+async def stream_job_logs(job_id: str):
+    """
+    Server-sent events: one `data:` event per log line, live while the job runs,
+    then an `end` event carrying the final job document.
+    """
+    if not await job_manager.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    # ====== Build Scrapy command ======
-    command = [SCRAPY_PATH, "crawl", "news_spider"]
+    async def events():
+        async for line in job_manager.tail_log(job_id):
+            yield f"data: {line}\n\n"
+        job = await job_manager.get(job_id)
+        yield b"event: end\ndata: " + dumps(job) + b"\n\n"
 
-    if keywords:
-        command += ["-a", f"keywords={','.join(keywords)}"]
-    if urls:
-        command += ["-a", f"urls={','.join(urls)}"]
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    # Add CSV output
-    command += ["-o", "output.csv"]
 
-    print(f"Running command: {' '.join(command)} in {SCRAPY_PROJECT_DIR}")
-    print(f"Frequency: {frequency}")
+# ----------- Live Feed -----------
+FEED_HEARTBEAT_SECONDS = 15
 
-    # ====== Run Scrapy subprocess ======
-    try:
-        print("Calling subprocess.run() for Scrapy...")
-        result = subprocess.run(
-            command,
-            cwd=SCRAPY_PROJECT_DIR,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print("Subprocess finished.")
-        print("stdout:", result.stdout)
-        print("stderr:", result.stderr)
-        status = "Spider run completed successfully"
-
-        # ====== Run enrichment script ======
-        print("Running enrich_articles.py...")
-        enrich_result = subprocess.run(
-            ["python3", ENRICH_SCRIPT_PATH],
-            cwd=SCRAPY_PROJECT_DIR,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print("Enrichment finished.")
-        print("stdout:", enrich_result.stdout)
-        print("stderr:", enrich_result.stderr)
-
-    except subprocess.CalledProcessError as e:
-        print("Subprocess finished with error.")
-        print("stdout:", e.stdout)
-        print("stderr:", e.stderr)
-        result = e
-        status = "Spider run failed"
-        enrich_result = None  # no enrichment if spider failed
-
-    # ====== Return result ======
-    return {
-        "status": status,
-        "command": " ".join(command),
-        "stdout": result.stdout if hasattr(result, 'stdout') else "",
-        "stderr": result.stderr if hasattr(result, 'stderr') else "",
-        "frequency": frequency,
-        "enrich_stdout": enrich_result.stdout if enrich_result else "",
-        "enrich_stderr": enrich_result.stderr if enrich_result else ""
-    }
+@app.get("/stream/articles")
+async def stream_articles(
+    request: Request,
+    collection: Optional[List[str]] = Query(None, description="articles and/or media_reports (default both)")
+):
+    """
+    Server-sent events: an `article` or `media_report` event, carrying the document,
+    whenever one is inserted or updated. Reconnecting with Last-Event-ID replays what was missed.
+    """
+    collections = collection or list(FEED_COLLECTIONS)
+    if not set(collections) <= set(FEED_COLLECTIONS):
+        raise HTTPException(status_code=400, detail=f"collection must be one of {', '.join(FEED_COLLECTIONS)}")
+
+    async def events():
+        queue = feed.subscribe()  # before the backfill, so nothing slips between the two
+        try:
+            yield "retry: 5000\n\n"
+            sent = set()
+            since = parse_event_id(request.headers.get("last-event-id"))
+            if since is not None:
+                for name, doc in await documents_since(since, collections):
+                    sent.add((doc["_id"], event_id(doc)))
+                    yield f"id: {event_id(doc)}\nevent: {FEED_COLLECTIONS[name]}\ndata: ".encode() + dumps(doc) + b"\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return  # fell behind; the client reconnects and catches up from its Last-Event-ID
+                name, doc = item
+                if name not in collections or (doc["_id"], event_id(doc)) in sent:
+                    continue
+                yield f"id: {event_id(doc)}\nevent: {FEED_COLLECTIONS[name]}\ndata: ".encode() + dumps(doc) + b"\n\n"
+        finally:
+            feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # GET all spider URLs
 @app.get("/spider_urls")
-def get_spider_urls_endpoint():
-    return get_all_spider_urls()
+async def get_spider_urls_endpoint():
+    return MongoJSONResponse(await get_all_spider_urls())
 
 # POST add new spider URL
 @app.post("/spider_urls")
-def create_spider_url_endpoint(url: str):
-    inserted_id = create_spider_url(url)
+async def create_spider_url_endpoint(url: str):
+    inserted_id = await create_spider_url(url)
     return {"inserted_id": inserted_id}
 
 # DELETE spider URL
 @app.delete("/spider_urls/{url_id}")
-def delete_spider_url_endpoint(url_id: str):
-    deleted = delete_spider_url(url_id)
+async def delete_spider_url_endpoint(url_id: str):
+    deleted = await delete_spider_url(url_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="URL not found or not deleted")
     return {"deleted": url_id}
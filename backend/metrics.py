@@ -0,0 +1,228 @@
+"""
+Request and MongoDB command metrics for the API, served at /metrics in the
+Prometheus text format.
+
+MetricsMiddleware times every HTTP request and counts the bytes it sends,
+labelled by route template (e.g. /articles/{article_id}), so one series
+covers all ids. CommandMetrics is a pymongo command listener, registered on
+every client in db.py; it records each command's server time and the
+documents it returned against the route of the request that issued it, and
+logs commands slower than SLOW_QUERY_MS.
+
+Metrics are kept per process: under serve.py each worker reports its own.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+
+from pymongo import monitoring
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DOCS_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000)
+
+# Route template of the request being handled, for commands it issues.
+# Commands run outside a request (startup, background jobs) are labelled "none".
+_request_scope = contextvars.ContextVar("request_scope", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic totals per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Observations per label set, counted into fixed upper-bound buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [le])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, extra=()):
+        """Prometheus text exposition of every metric, followed by `extra` (name, help, kind, value) gauges."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, help, kind, value in extra:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.add(Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")))
+http_latency = registry.add(Histogram(
+    "http_request_duration_seconds", "Time from request to last response byte.", ("method", "route")))
+http_response_size = registry.add(Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS))
+mongo_duration = registry.add(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round-trip time, by the route that issued it.",
+    ("route", "command", "collection")))
+mongo_docs = registry.add(Histogram(
+    "mongo_command_documents_returned", "Documents returned by find, aggregate and getMore batches.",
+    ("route", "command", "collection"), DOCS_BUCKETS))
+mongo_failures = registry.add(Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error.", ("route", "command", "collection")))
+mongo_slow = registry.add(Counter(
+    "mongo_slow_commands_total", f"MongoDB commands slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).",
+    ("route", "command", "collection")))
+
+
+def route_label(scope):
+    """Route template matched for an ASGI scope, or "unmatched"."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route():
+    scope = _request_scope.get()
+    return route_label(scope) if scope is not None else "none"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and response size per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _request_scope.set(scope)
+        started = time.perf_counter()
+        response = {"status": 500, "size": 0}
+
+        async def send_and_count(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            _request_scope.reset(token)
+            labels = (scope["method"], route_label(scope))
+            http_latency.observe(labels, time.perf_counter() - started)
+            http_response_size.observe(labels, response["size"])
+            http_requests.inc(labels + (str(response["status"]),))
+
+
+def _collection_name(event):
+    target = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Attributes MongoDB command time and returned documents to the current route."""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.slow_seconds = slow_ms / 1000
+        self._pending = {}  # (connection, request id) -> labels
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = (
+            current_route(), event.command_name, _collection_name(event)
+        )
+
+    def succeeded(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is None:
+            return
+        seconds = event.duration_micros / 1e6
+        mongo_duration.observe(labels, seconds)
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+            if batch is not None:
+                mongo_docs.observe(labels, len(batch))
+        if seconds >= self.slow_seconds:
+            mongo_slow.inc(labels)
+            route, command, collection = labels
+            print(f"🐢 Slow MongoDB {command} on '{collection}' took {seconds * 1000:.0f} ms (route {route})")
+
+    def failed(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is None:
+            return
+        mongo_duration.observe(labels, event.duration_micros / 1e6)
+        mongo_failures.inc(labels)
+
+
+command_metrics = CommandMetrics()
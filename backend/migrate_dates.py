@@ -0,0 +1,48 @@
+"""
+One-off migration: add a normalized published_at datetime to every article,
+company and media report, parsed from its free-form publication date.
+
+    python migrate_dates.py          # only documents without published_at
+    python migrate_dates.py --all    # re-parse every document
+"""
+import sys
+
+from pymongo import UpdateOne
+
+from db import db
+from dates import PUBLISHED_AT_FIELD, SOURCE_DATE_FIELDS, parse_date
+from versions import bump
+
+BATCH_SIZE = 1000
+
+
+def migrate_collection(name, reparse_all=False):
+    source_field = SOURCE_DATE_FIELDS[name]
+    collection = db[name]
+    query = {} if reparse_all else {PUBLISHED_AT_FIELD: {"$exists": False}}
+
+    parsed = unparsed = 0
+    ops = []
+    for doc in collection.find(query, {source_field: 1}).batch_size(BATCH_SIZE):
+        published_at = parse_date(doc.get(source_field))
+        if published_at is None:
+            unparsed += 1
+        else:
+            parsed += 1
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {PUBLISHED_AT_FIELD: published_at}}))
+        if len(ops) >= BATCH_SIZE:
+            collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    if parsed or unparsed:
+        bump(db, name)
+
+    print(f"{name}: {parsed} dates parsed, {unparsed} left as null")
+
+
+if __name__ == "__main__":
+    reparse_all = "--all" in sys.argv
+    for name in SOURCE_DATE_FIELDS:
+        migrate_collection(name, reparse_all)
+    print("Run `python indexes.py ensure` (or start the API) to create the published_at indexes.")
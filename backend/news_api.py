@@ -1,11 +1,13 @@
 from flask import Flask, request, render_template, jsonify
-from news_ingest_service import validate_feeds, collect_entries, save_to_csv
-from rss_config import CSV_OUTPUT_PATH
+from news_ingest_service import validate_and_collect, save_entries
+from feed_state import format_counts
+from collections import Counter
+from seen_store import seen_links
 from news_scheduler import scheduled_job
+from rss_config import FETCH_TICK_SECONDS
 from apscheduler.schedulers.background import BackgroundScheduler
 import os
 import json
-import pandas as pd
 
 app = Flask(__name__)
 FEED_FILE = "submitted_feeds.json"
@@ -41,26 +43,22 @@ def check_feeds():
 
     base_urls = [url.strip() for url in url_param.replace('\n', ',').split(',') if url.strip()]
     append_unique_urls(base_urls)
-    valid_feeds, log = validate_feeds(base_urls)
+    fetch_counts = Counter()
+    valid_feeds, log, all_entries = validate_and_collect(base_urls, stats=fetch_counts)
+    log.append(f"🗂️ Feed cache: {format_counts(fetch_counts)}")
 
-    existing_links = set()
-    if os.path.exists(CSV_OUTPUT_PATH):
-        df_existing = pd.read_csv(CSV_OUTPUT_PATH)
-        existing_links = set(df_existing['link'].dropna().unique())
-
-    all_entries = collect_entries(valid_feeds)
 
     new_entries = []
     updates_per_feed = {}
-    for entry in all_entries:
-        if entry['link'] not in existing_links:
-            new_entries.append(entry)
-            src = entry['source']
-            updates_per_feed[src] = updates_per_feed.get(src, 0) + 1
+    for entry in seen_links.new_entries(all_entries):
+        new_entries.append(entry)
+        src = entry['source']
+        updates_per_feed[src] = updates_per_feed.get(src, 0) + 1
 
     if new_entries:
-        save_to_csv(new_entries, filename=CSV_OUTPUT_PATH)
-        log.append(f"💾 {len(new_entries)} entries collected and saved to CSV.")
+        save_entries(new_entries)
+        seen_links.add(entry['link'] for entry in new_entries)
+        log.append(f"💾 {len(new_entries)} entries collected and saved.")
     else:
         log.append("📭 No new entries to save.")
 
@@ -73,10 +71,13 @@ def check_feeds():
     )
 
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(scheduled_job, 'interval', minutes=1/2)
-scheduler.start()
-print("🚀 Background scheduler started with Flask app")
+# feed_fetcher's parse workers import the main module again as __mp_main__; only the app runs the scheduler
+if __name__ != "__mp_main__":
+    scheduler = BackgroundScheduler()
+    # A cheap check for due feeds; each feed's own interval is set by feed_schedule.py
+    scheduler.add_job(scheduled_job, 'interval', seconds=FETCH_TICK_SECONDS, max_instances=1, coalesce=True)
+    scheduler.start()
+    print("🚀 Background scheduler started with Flask app")
 
 if __name__ == "__main__":
     app.run(debug=True, use_reloader=False)
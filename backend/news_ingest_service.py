@@ -1,93 +1,117 @@
-import feedparser
-import pandas as pd
-from datetime import datetime
-from bs4 import BeautifulSoup
-import re
-from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from collections import Counter
 
-from rss_config import BASE_URLS, RSS_SUFFIX, CSV_OUTPUT_PATH
+from rss_config import BASE_URLS, RSS_SUFFIX
+from entry_store import entry_store
+from feed_fetcher import fetch_feeds
+from feed_parse import clean_html, feed_entries  # re-exported: they used to live here
+from feed_schedule import schedule_after_fetch
+from feed_state import feed_state
 
 # -------- Base URLs to Test -------- #
 
 base_urls = BASE_URLS
 
-# -------- HTML Cleaning -------- #
-
-def clean_html(raw_html):
-    soup = BeautifulSoup(raw_html, 'html.parser')
-    text = soup.get_text()
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-# -------- Feed Validation -------- #
-
-def validate_feeds(base_urls):
-    valid_feeds = []
-    log = []
-
-    def check_feed(url):
-        rss_url = url.rstrip('/') + "/feed/"
-        feed = feedparser.parse(rss_url)
-        if not feed.bozo and feed.entries:
-            msg = f"✅ Valid feed found: {rss_url} ({len(feed.entries)} entries)"
-            return rss_url, msg
-        else:
-            msg = f"❌ Not a valid RSS feed: {rss_url}"
-            return None, msg
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(check_feed, base_urls)
-
-    for feed_url, msg in results:
+# -------- Feed Validation + Collection -------- #
+
+# A feed that validated is trusted for this long: a failed fetch or a
+# malformed body in between is reported but does not drop it.
+VALIDATION_TTL_SECONDS = 6 * 3600
+# An invalid feed is not fetched again for 1, 2, 4, ... minutes, up to 6 hours
+VALIDATION_BACKOFF_SECONDS = 60
+VALIDATION_BACKOFF_MAX_SECONDS = 6 * 3600
+
+def feed_url(base_url):
+    return base_url.rstrip('/') + RSS_SUFFIX
+
+def _since(timestamp, now):
+    return (now - datetime.fromisoformat(timestamp)).total_seconds() if timestamp else float("inf")
+
+def _judge(rss_url, saved, now, result, parsed):
+    """Decide whether a fetched feed is valid and update its verdict; returns (rss_url or None, log message, entries)."""
+    trusted = saved.get("valid") and _since(saved.get("validated_at"), now) < VALIDATION_TTL_SECONDS
+    entries = parsed["entries"] if parsed else []
+    if result == "changed":
+        ok = bool(entries) and not parsed["bozo"]
+        msg = f"✅ Valid feed found: {rss_url} ({len(entries)} entries)"
+    elif result in ("not_modified", "unchanged"):
+        ok = bool(saved.get("valid"))  # same content as when it was last judged
+        msg = f"✅ Valid feed, unchanged since last fetch: {rss_url}"
+    else:
+        ok = False
+        msg = f"⚠️ Could not fetch {rss_url}: {feed_state.get(rss_url).get('error')}"
+
+    if ok or trusted:
+        if not ok:
+            msg = f"⚠️ {rss_url} failed validation ({result}) but was valid recently; keeping it"
+        validated_at = now.isoformat() if ok else saved["validated_at"]
+        feed_state.update(rss_url, valid=True, validated_at=validated_at, failures=0, retry_at="")
+        return rss_url, msg, entries
+
+    failures = saved.get("failures", 0) + 1
+    delay = min(VALIDATION_BACKOFF_SECONDS * 2 ** (failures - 1), VALIDATION_BACKOFF_MAX_SECONDS)
+    feed_state.update(rss_url, valid=False, failures=failures, retry_at=(now + timedelta(seconds=delay)).isoformat())
+    return None, f"❌ Not a valid RSS feed: {rss_url} (next check in {delay // 60} min)", []
+
+def validate_and_collect(base_urls, stats=None):
+    """Validate the /feed/ URL of each base URL and collect its new entries from the same download.
+
+    Returns (valid feed URLs, log messages, entries). Verdicts are cached in
+    feed_state.json: valid feeds are trusted for VALIDATION_TTL_SECONDS, and
+    invalid ones are skipped with exponential backoff. Each fetched feed's
+    next fetch is scheduled (feed_schedule.py). Pass a Counter as `stats`
+    to get the number of feeds per fetch result ("backoff" for skipped ones).
+    """
+    stats = Counter() if stats is None else stats
+    now = datetime.utcnow()
+    valid_feeds, log, all_entries = [], [], []
+
+    feeds = []  # (rss_url, saved state, skip message)
+    for base_url in base_urls:
+        rss_url = feed_url(base_url)
+        saved = feed_state.get(rss_url)
+        skip = None
+        if not saved.get("valid") and saved.get("retry_at") and datetime.fromisoformat(saved["retry_at"]) > now:
+            skip = f"⏭️ Skipped {rss_url}: invalid, next check after {saved['retry_at'][:16]}"
+        feeds.append((rss_url, saved, skip))
+
+    fetched = fetch_feeds(
+        [rss_url for rss_url, _, skip in feeds if not skip],
+        force=[rss_url for rss_url, saved, skip in feeds if not skip and "valid" not in saved],  # never judged: needs the body
+    )
+
+    for rss_url, saved, skip in feeds:
+        if skip:
+            stats["backoff"] += 1
+            log.append(skip)
+            continue
+        result, parsed = fetched[rss_url]
+        stats[result] += 1
+        schedule_after_fetch(rss_url, result, parsed["entries"] if parsed else (), now)
+        valid_url, msg, entries = _judge(rss_url, saved, now, result, parsed)
         log.append(msg)
-        if feed_url:
-            valid_feeds.append(feed_url)
-
-    return valid_feeds, log
-
-
-# -------- Feed Collection -------- #
-
-def collect_entries(feed_urls):
-    all_entries = []
-
-    def process_feed(url):
-        entries = []
-        feed = feedparser.parse(url)
-        for entry in feed.entries:  #  feed.entries[:10] limit to 10 entries per feed (optional)
-            raw_description = entry.content[0].value if "content" in entry else entry.get("summary", "")
-            description = clean_html(raw_description)
-
-            entries.append({
-                "title": entry.get("title", ""),
-                "link": entry.get("link", ""),
-                "published": entry.get("published", ""),
-                "description": description,
-                "source": feed.feed.get("title", ""),
-            })
-        return entries
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(process_feed, feed_urls)
+        if valid_url:
+            valid_feeds.append(valid_url)
+            all_entries.extend(entries)
 
-    for feed_entries in results:
-        all_entries.extend(feed_entries)
+    feed_state.save()
+    return valid_feeds, log, all_entries
 
-    return all_entries
+# -------- Entry Storage -------- #
 
-def save_to_csv(entries, filename="rss_feed_data.csv"):
-    df = pd.DataFrame(entries)
-    df["fetched_at"] = datetime.now().isoformat()
-    df.to_csv(filename, index=False)
-    print(f"\n💾 Saved {len(df)} entries to {filename}")
+def save_entries(entries, store=entry_store):
+    """Append entries to today's partition of the entry store; returns the new segment's path."""
+    path = store.append(entries)
+    print(f"\n💾 Saved {len(entries)} entries to {path}")
+    return path
 
 # -------- Main -------- #
 
 if __name__ == "__main__":
-    valid_rss_feeds = validate_feeds(base_urls)
+    valid_rss_feeds, log, entries = validate_and_collect(base_urls)
+    print("\n".join(log))
 
     if not valid_rss_feeds:
         print("🚫 No valid feeds found. Exiting.")
     else:
-        entries = collect_entries(valid_rss_feeds)
-        save_to_csv(entries, filename=CSV_OUTPUT_PATH)
+        save_entries(entries)
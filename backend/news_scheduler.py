@@ -1,9 +1,11 @@
 import os
 import json
-import pandas as pd
 from datetime import datetime
-from news_ingest_service import validate_feeds, collect_entries, save_to_csv
-from rss_config import CSV_OUTPUT_PATH
+from collections import Counter
+from news_ingest_service import validate_and_collect, save_entries, feed_url
+from feed_schedule import is_due, next_fetch_at
+from feed_state import feed_state, format_counts
+from seen_store import seen_links
 
 FEED_URLS_FILE = "submitted_feeds.json"
 LOG_FILE = "scheduler_log.json"
@@ -32,18 +34,13 @@ def load_urls_from_file():
             print(f"⚠️ Error loading feed URLs: {e}")
     return []
 
-def scheduled_job():
-    print("⏰ Running scheduled RSS fetch...")
-
-    existing_links = set()
-    if os.path.exists(CSV_OUTPUT_PATH):
-        try:
-            df_existing = pd.read_csv(CSV_OUTPUT_PATH)
-            existing_links = set(df_existing['link'].dropna().unique())
-            print(f"📄 Loaded {len(existing_links)} previously saved entries.")
-        except Exception as e:
-            print(f"⚠️ Failed to read existing CSV: {e}")
+def next_due(feed_urls):
+    """Earliest next fetch among the feeds, or None if one is due now or was never fetched."""
+    times = [next_fetch_at(feed_state.get(feed_url(url))) for url in feed_urls]
+    return None if None in times else min(times, default=None)
 
+def scheduled_job():
+    """Runs every FETCH_TICK_SECONDS; fetches only the feeds whose next fetch is due (see feed_schedule.py)."""
     feed_urls = load_urls_from_file()
     if not feed_urls:
         msg = "📭 No feed URLs found in submitted_feeds.json."
@@ -51,20 +48,33 @@ def scheduled_job():
         log_scheduler_activity(msg)
         return
 
-    valid_feeds, log = validate_feeds(feed_urls)
+    now = datetime.utcnow()
+    due_urls = [url for url in feed_urls if is_due(feed_url(url), now)]
+    if not due_urls:
+        return
+    print(f"⏰ Running scheduled RSS fetch: {len(due_urls)} of {len(feed_urls)} feeds due...")
+
+    fetch_counts = Counter()
+    valid_feeds, log, entries = validate_and_collect(due_urls, stats=fetch_counts)
     if not valid_feeds:
         msg = "⚠️ No valid feeds found during scheduled run."
         print(msg)
         log_scheduler_activity(msg)
         return
 
-    entries = collect_entries(valid_feeds)
-    new_entries = [entry for entry in entries if entry['link'] not in existing_links]
+    new_entries = seen_links.new_entries(entries)
     msg = f"🆕 {len(new_entries)} new entries found."
     print(msg)
+    cache_msg = f"🗂️ Feed cache this run: {format_counts(fetch_counts)}; all time: {format_counts(feed_state.totals())}"
+    upcoming = next_due(feed_urls)
+    if upcoming:
+        cache_msg += f"; next fetch at {upcoming.isoformat(timespec='seconds')}"
+    print(cache_msg)
+    log_scheduler_activity(cache_msg)
 
     if new_entries:
-        save_to_csv(new_entries, filename=CSV_OUTPUT_PATH)
+        save_entries(new_entries)
+        seen_links.add(entry['link'] for entry in new_entries)
         log_scheduler_activity(f"✅ Fetched {len(new_entries)} new entries from {len(valid_feeds)} feeds.")
     else:
         log_scheduler_activity("📭 No new entries to save.")
@@ -0,0 +1,83 @@
+"""
+Fast JSON encoding for MongoDB documents.
+
+orjson writes datetimes natively and `_default` turns ObjectId (and any
+other BSON type) into a string, so documents can be returned straight from
+the cursor without first rewriting `_id` in Python.
+
+Endpoints that return documents hand back a MongoJSONResponse directly:
+FastAPI sends a returned Response as-is instead of running
+jsonable_encoder over every document.
+
+@conditional adds ETag / If-None-Match handling to a GET endpoint.
+"""
+import functools
+import inspect
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from db import get_async_db
+from versions import etag_matches, get_versions, make_etag
+
+
+def _default(value):
+    # Only called for types orjson does not know: ObjectId, Decimal128, ...
+    return str(value)
+
+
+def dumps(content):
+    """Serialize `content` (documents, lists, dicts) to JSON bytes."""
+    return orjson.dumps(content, default=_default)
+
+
+def ndjson_chunk(docs):
+    """Serialize documents as newline-delimited JSON bytes, ending in a newline."""
+    return b"".join(orjson.dumps(doc, default=_default, option=orjson.OPT_APPEND_NEWLINE) for doc in docs)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, accepting ObjectId and datetime values."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def conditional(*collections):
+    """Answer If-None-Match with 304 while none of `collections` has been written to.
+
+    The ETag comes from the collections' version counters and the request's
+    path and query, and is read before the endpoint runs: a write that lands
+    meanwhile can only make the next poll refetch, never hide a change.
+    Put it above @cached so a 304 skips the cache lookup as well; @cached
+    keys its entries on the same versions, so a cached body is never served
+    under an ETag newer than its data.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        wants_request = "request" in signature.parameters
+
+        @functools.wraps(func)
+        async def wrapper(request: Request, **kwargs):
+            versions = await get_versions(get_async_db(), collections)
+            etag = make_etag(versions, request.url.path, request.query_params.multi_items())
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            if wants_request:
+                kwargs["request"] = request
+            result = await func(**kwargs)
+            if not isinstance(result, Response):
+                return MongoJSONResponse(result, headers=headers)
+            # Copy rather than modify: the response may be shared through the cache
+            return Response(result.body, status_code=result.status_code, headers={**result.headers, **headers})
+
+        # FastAPI reads the endpoint's parameters from here: the original ones plus the request
+        if not wants_request:
+            wrapper.__signature__ = signature.replace(parameters=[
+                inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request),
+                *signature.parameters.values(),
+            ])
+        return wrapper
+    return decorator
@@ -11,9 +11,19 @@ BASE_URLS = [
 
 RSS_SUFFIX = "/feed/"  # RSS URL format (appends to base)
 
-CSV_OUTPUT_PATH = "rss_feed_data.csv"
+CSV_OUTPUT_PATH = "rss_feed_data.csv"  # single CSV used before entry_store.py; read once for migration
+ENTRY_STORE_DIR = "rss_entries"  # day-partitioned JSONL segments
 
-FETCH_INTERVAL_HOURS = 0  # How often to fetch feeds
-FETCH_INTERVAL_MINUTES = 3  # Instead of hours
+FEED_STATE_PATH = "feed_state.json"  # ETag / Last-Modified / body hash per feed
+SEEN_DB_PATH = "seen_links.sqlite3"  # every entry link collected so far
+
+# Per-feed polling (feed_schedule.py): each feed is fetched FETCH_POLLS_PER_POST
+# times per its average gap between posts, within these bounds
+FETCH_INTERVAL_HOURS = 0  # Shortest interval between fetches of a feed
+FETCH_INTERVAL_MINUTES = 3  # Added to the hours
+FETCH_INTERVAL_MAX_HOURS = 1  # Longest, so a quiet feed's next post is still picked up within the hour
+FETCH_POLLS_PER_POST = 6
+FETCH_ERROR_BACKOFF_MAX_HOURS = 6  # Failing feeds back off up to this
+FETCH_TICK_SECONDS = 30  # How often the scheduler looks for due feeds
 
 
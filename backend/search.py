@@ -0,0 +1,177 @@
+import heapq
+import html
+import re
+import unicodedata
+from datetime import datetime
+
+from pymongo import DESCENDING, TEXT
+
+from dates import PUBLISHED_AT_FIELD, date_range
+
+# ---------- Text Index Definitions ----------
+# Searchable fields per collection and their weights in the text index.
+SEARCH_FIELDS = {
+    "articles": {"Título": 10, "Descripción en una frase": 5, "Resumen": 1},
+    "companies": {"Empresa protagonista (Nombre)": 10, "Titulo": 5, "Descripción breve": 2},
+    "media_reports": {"Title": 10, "Tema Principal": 5, "Full Text": 1},
+}
+
+# Source URL field per collection, used to deduplicate merged results
+URL_FIELDS = {
+    "articles": "URL",
+    "companies": "URL de la fuente original",
+    "media_reports": "URL",
+}
+
+TEXT_INDEX_NAME = "search_text"
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+DEFAULT_COLLECTION_LIMIT = 200  # hits fetched per collection
+MAX_COLLECTION_LIMIT = 1000
+DEFAULT_TOTAL_LIMIT = 500  # merged hits across all collections
+MAX_TOTAL_LIMIT = 2000
+SNIPPET_WIDTH = 160
+
+
+def text_index_spec(name):
+    """Return (keys, options) for the text index of a collection.
+
+    published_at is a suffix key, so a date range next to $text is applied
+    inside the index instead of on every fetched match.
+    """
+    fields = SEARCH_FIELDS[name]
+    keys = [(field, TEXT) for field in fields] + [(PUBLISHED_AT_FIELD, DESCENDING)]
+    options = {
+        "name": TEXT_INDEX_NAME,
+        "weights": fields,
+        # Content is a mix of English and Spanish, so index words as-is
+        # (no stemming or stop words) rather than guess a language.
+        "default_language": "none",
+        "language_override": "text_language",
+    }
+    return keys, options
+
+
+def text_query(name, keyword, date_from=None, date_to=None):
+    """Build the search filter for one collection: $text on `keyword` and an optional published_at range.
+
+    Without a keyword only the date range is applied, which the published_at
+    index serves (and sorts) on its own.
+    Raises ValueError if a date bound cannot be parsed.
+    """
+    query = {"$text": {"$search": keyword}} if keyword else {}
+    bounds = date_range(date_from, date_to)
+    if bounds:
+        query[PUBLISHED_AT_FIELD] = bounds
+    return query
+
+
+def check_page(page, page_size, limit):
+    """Raise ValueError if `page` starts past the `limit` merged hits a search can return."""
+    limit = min(limit, MAX_TOTAL_LIMIT)
+    if (page - 1) * page_size >= limit:
+        raise ValueError(
+            f"page {page} starts past the {limit} results a search returns; "
+            f"raise limit (at most {MAX_TOTAL_LIMIT}) or use larger pages"
+        )
+
+
+def search_order(keyword, sort):
+    """Return the order a search can use: there is no relevance score without a keyword."""
+    return sort if keyword else "date"
+
+
+def search_projection(keyword):
+    """Return the projection of one collection's search query (the text score, if there is one)."""
+    return {"score": {"$meta": "textScore"}} if keyword else None
+
+
+def search_sort(name, sort):
+    """Return the sort spec for one collection's search query, best hits first."""
+    if sort == "date":
+        return [(PUBLISHED_AT_FIELD, -1)]
+    return [("score", {"$meta": "textScore"})]
+
+
+def _sort_key(sort):
+    if sort == "date":
+        return lambda doc: doc.get(PUBLISHED_AT_FIELD) or datetime.min
+    return lambda doc: doc["score"]
+
+
+def merge_results(result_lists, sort="score", limit=DEFAULT_TOTAL_LIMIT):
+    """Merge per-collection hit lists (each already sorted best-first), dropping repeated URLs."""
+    seen_urls = set()
+    merged = []
+    for doc in heapq.merge(*result_lists, key=_sort_key(sort), reverse=True):
+        url = doc.get(URL_FIELDS[doc["collection"]])
+        if url:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+        merged.append(doc)
+        if len(merged) >= limit:
+            break
+    return merged
+
+
+# ---------- Highlighting ----------
+
+def _fold(text):
+    """Lowercase and strip accents one character at a time, keeping offsets aligned."""
+    folded = []
+    for ch in text:
+        base = unicodedata.normalize("NFKD", ch)[:1] or ch
+        folded.append(base.lower()[:1] or " ")
+    return "".join(folded)
+
+
+def search_terms(keyword):
+    """Return the positive terms of a $text search string, folded for matching."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', keyword or ""):
+        term = phrase or word
+        if term.startswith("-"):
+            continue  # negated terms never appear in results
+        term = _fold(term.strip())
+        if term:
+            terms.append(term)
+    return terms
+
+
+def make_snippet(text, terms, width=SNIPPET_WIDTH):
+    """Return an HTML-escaped window of `text` around the first match with terms in <mark>, or None."""
+    if not isinstance(text, str) or not text or not terms:
+        return None
+    folded = _fold(text)
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)))
+    first = pattern.search(folded)
+    if not first:
+        return None
+
+    start = max(0, first.start() - width // 3)
+    end = min(len(text), start + width)
+    parts = []
+    pos = start
+    for m in pattern.finditer(folded, start, end):
+        parts.append(html.escape(text[pos:m.start()]))
+        parts.append("<mark>" + html.escape(text[m.start():m.end()]) + "</mark>")
+        pos = m.end()
+    parts.append(html.escape(text[pos:end]))
+
+    snippet = "".join(parts).strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+    return snippet
+
+
+def highlight(doc, name, terms):
+    """Return {field: snippet} for every searchable field of `doc` that contains a term."""
+    highlights = {}
+    for field in SEARCH_FIELDS[name]:
+        snippet = make_snippet(doc.get(field), terms)
+        if snippet:
+            highlights[field] = snippet
+    return highlights
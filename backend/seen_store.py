@@ -0,0 +1,160 @@
+"""
+Persistent record of every RSS entry link already collected.
+
+Links live in a SQLite table keyed by the link itself, so checking a batch
+costs one index lookup per link in the batch, whatever the history size, and
+new links are appended rather than rewriting a file. Memory use does not grow
+with history.
+
+An optional Bloom filter in front answers "definitely new" without touching
+SQLite. It is fixed-size (SEEN_BLOOM_CAPACITY links at about 1% false
+positives, ~1.2 MB per million), built from the table on first use. Past its
+capacity it only gets less selective, never wrong: every "maybe seen" is
+confirmed in SQLite.
+
+    python seen_store.py import rss_feed_data.csv   # add the links of an existing CSV
+    python seen_store.py count
+"""
+import csv
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+from rss_config import CSV_OUTPUT_PATH, SEEN_DB_PATH
+
+SEEN_BLOOM = os.environ.get("SEEN_BLOOM", "0") == "1"
+SEEN_BLOOM_CAPACITY = int(os.environ.get("SEEN_BLOOM_CAPACITY", 1_000_000))
+SEEN_BLOOM_ERROR_RATE = 0.01
+_BATCH_SIZE = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=SEEN_BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenStore:
+    """Links seen so far, in SQLite, optionally fronted by a Bloom filter."""
+
+    def __init__(self, path=SEEN_DB_PATH, bloom=SEEN_BLOOM, import_csv=CSV_OUTPUT_PATH):
+        self.path = path
+        self.use_bloom = bloom
+        self.import_csv = import_csv
+        self._conn = None
+        self._bloom = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        is_new = not os.path.exists(self.path)
+        # Shared by the Flask request threads and the scheduler thread, under self._lock
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS seen (link TEXT PRIMARY KEY, first_seen TEXT) WITHOUT ROWID")
+        self._conn = conn
+        if is_new and self.import_csv and os.path.exists(self.import_csv):
+            # First run after the CSV-based dedup: keep its links
+            self._insert(csv_links(self.import_csv))
+        if self.use_bloom:
+            self._bloom = BloomFilter(SEEN_BLOOM_CAPACITY)
+            for (link,) in conn.execute("SELECT link FROM seen"):
+                self._bloom.add(link)
+        return conn
+
+    def _insert(self, links):
+        """Add links in batches; returns how many were not there yet."""
+        now = datetime.utcnow().isoformat()
+        added = 0
+        batch = []
+        for link in links:
+            if link:
+                batch.append((link, now))
+            if len(batch) >= _BATCH_SIZE:
+                added += self._insert_batch(batch)
+                batch = []
+        return added + self._insert_batch(batch)
+
+    def _insert_batch(self, rows):
+        if not rows:
+            return 0
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO seen (link, first_seen) VALUES (?, ?)", rows)
+            added = self._conn.total_changes - before
+        if self._bloom is not None:
+            for link, _ in rows:
+                self._bloom.add(link)
+        return added
+
+    def _is_seen(self, link):
+        if self._bloom is not None and link not in self._bloom:
+            return False
+        return self._conn.execute("SELECT 1 FROM seen WHERE link = ?", (link,)).fetchone() is not None
+
+    def new_entries(self, entries, key="link"):
+        """Entries whose link has not been seen, first occurrence only. Entries without a link always count as new."""
+        with self._lock:
+            self._connect()
+            batch_links = set()
+            new = []
+            for entry in entries:
+                link = entry.get(key)
+                if link:
+                    if link in batch_links or self._is_seen(link):
+                        continue
+                    batch_links.add(link)
+                new.append(entry)
+            return new
+
+    def add(self, links):
+        """Record links as seen; returns how many were new."""
+        with self._lock:
+            self._connect()
+            return self._insert(links)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+def csv_links(path):
+    """Stream the `link` column of an entries CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("link"):
+                yield row["link"]
+
+
+seen_links = SeenStore()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        print(f"➕ {seen_links.add(csv_links(sys.argv[2]))} new links imported from {sys.argv[2]}")
+    elif sys.argv[1:] == ["count"]:
+        print(f"{len(seen_links)} links seen")
+    else:
+        print(__doc__)
+        sys.exit(1)
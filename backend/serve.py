@@ -0,0 +1,43 @@
+"""
+Production entry point: serve the API from several worker processes.
+
+    python serve.py --workers 4 --port 8000
+
+Indexes are checked once here, before the workers start, rather than by
+every worker (they run with INDEX_CHECK_ON_STARTUP=0). Each worker opens its
+own MongoDB clients on first use. Point liveness probes at /healthz and
+readiness probes at /readyz.
+"""
+import argparse
+import os
+
+import uvicorn
+from pymongo.errors import PyMongoError
+
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def check_indexes_once():
+    """Create missing indexes in this process; returns False if MongoDB could not be reached."""
+    from db import db
+    from indexes import ensure_indexes
+    try:
+        ensure_indexes(db, report_unused=False)
+        return True
+    except PyMongoError as e:
+        print(f"❌ Index check failed, workers will retry it: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the FastAPI app with N worker processes.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--skip-index-check", action="store_true", help="leave the index check to each worker")
+    args = parser.parse_args()
+
+    if not args.skip_index_check and check_indexes_once():
+        os.environ["INDEX_CHECK_ON_STARTUP"] = "0"  # inherited by the workers
+    print(f"🚀 Serving on {args.host}:{args.port} with {args.workers} worker(s)")
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, proxy_headers=True)
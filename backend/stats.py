@@ -0,0 +1,208 @@
+"""
+Dashboard statistics over news_company_profiles.
+
+Chart queries read the stats_rollup collection, which holds one document per
+(day, category, country, sentiment) bucket:
+
+    {"_id": {"day": datetime, "category": "Fintech", "country": "Chile", "sentiment": "positive"}, "count": 12}
+
+so they cost O(buckets) rather than O(profiles). crud.py and async_crud.py
+apply +1/-1 to the affected buckets on every profile write. A profile's day
+is the published_at of the article it was enriched from (matched on
+site_url), stamped onto the profile when it is written.
+
+Only writes through those functions (the API, including /bulk/) keep the
+rollup current. Writes made straight to MongoDB (mongoimport, the shell,
+scripts with their own client) are not counted; rebuild the rollup from the
+profiles after them:
+
+    python stats.py rebuild
+"""
+import re
+import sys
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from dates import PUBLISHED_AT_FIELD, date_range
+from versions import bump
+
+PROFILES_COLLECTION = "news_company_profiles"
+PROFILE_URL_FIELD = "site_url"
+ROLLUP_COLLECTION = "stats_rollup"
+FACET_FIELDS = ("category", "country", "sentiment")
+TIMESERIES_INTERVALS = ("day", "week", "month")
+
+# enrich_articles.py stores sent_analysis as str({"label": ..., "score": ...})
+_SENTIMENT_LABEL = re.compile(r"""['"]label['"]\s*:\s*['"](\w+)['"]""")
+
+
+def sentiment_label(value):
+    """Return the sentiment label of a profile's sent_analysis, or None."""
+    if isinstance(value, dict):
+        return value.get("label")
+    if isinstance(value, str):
+        match = _SENTIMENT_LABEL.search(value)
+        return match.group(1) if match else None
+    return None
+
+
+def bucket_key(profile):
+    """Return the rollup _id of the bucket a profile is counted in."""
+    published_at = profile.get(PUBLISHED_AT_FIELD)
+    return {
+        "day": published_at.replace(hour=0, minute=0, second=0, microsecond=0) if published_at else None,
+        "category": profile.get("category"),
+        "country": profile.get("country"),
+        "sentiment": sentiment_label(profile.get("sent_analysis")),
+    }
+
+
+def rollup_ops(removed=(), added=()):
+    """Return the $inc updates that move `removed` profiles out of their buckets and `added` ones in."""
+    deltas = Counter()
+    for profile in removed:
+        deltas[tuple(bucket_key(profile).items())] -= 1
+    for profile in added:
+        deltas[tuple(bucket_key(profile).items())] += 1
+    return [
+        UpdateOne({"_id": dict(key)}, {"$inc": {"count": delta}}, upsert=True)
+        for key, delta in deltas.items() if delta
+    ]
+
+
+# Buckets whose last profile was removed are deleted with this filter
+EMPTY_BUCKETS = {"count": {"$lte": 0}}
+
+
+def article_dates_query(profiles):
+    """Return the articles filter for profiles that have no published_at yet, or None if there are none."""
+    urls = {
+        p.get(PROFILE_URL_FIELD) for p in profiles
+        if isinstance(p, dict) and PUBLISHED_AT_FIELD not in p
+    } - {None, ""}
+    return {"URL": {"$in": list(urls)}} if urls else None
+
+
+def set_article_dates(profiles, articles):
+    """Copy the published_at of each profile's article onto profiles that have none."""
+    dates = {a["URL"]: a.get(PUBLISHED_AT_FIELD) for a in articles}
+    for p in profiles:
+        if isinstance(p, dict) and PUBLISHED_AT_FIELD not in p and p.get(PROFILE_URL_FIELD) in dates:
+            p[PUBLISHED_AT_FIELD] = dates[p[PROFILE_URL_FIELD]]
+
+
+# ---------- Query pipelines ----------
+
+def _match(category=None, country=None, sentiment=None, date_from=None, date_to=None):
+    """$match on bucket fields. Raises ValueError for an unparseable date."""
+    match = {}
+    for field, values in (("category", category), ("country", country), ("sentiment", sentiment)):
+        if values:
+            match[f"_id.{field}"] = {"$in": values if isinstance(values, list) else [values]}
+    bounds = date_range(date_from, date_to)
+    if bounds:
+        match["_id.day"] = bounds
+    return {"$match": match}
+
+
+def facets_pipeline(**filters):
+    """Count profiles per category, country and sentiment in one $facet pass over the rollup."""
+    facets = {
+        field: [
+            {"$group": {"_id": f"$_id.{field}", "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        for field in FACET_FIELDS
+    }
+    facets["total"] = [{"$group": {"_id": None, "count": {"$sum": "$count"}}}]
+    return [_match(**filters), {"$facet": facets}]
+
+
+def facets_response(result):
+    """Shape the $facet output as {"total": n, field: [{"value", "count"}, ...]}."""
+    result = result[0] if result else {}
+    response = {"total": result["total"][0]["count"] if result.get("total") else 0}
+    for field in FACET_FIELDS:
+        response[field] = [{"value": b["_id"], "count": b["count"]} for b in result.get(field, [])]
+    return response
+
+
+def timeseries_pipeline(interval="day", by=None, **filters):
+    """Count profiles per `interval` (day, week or month), split by one facet field if `by` is set."""
+    match = _match(**filters)
+    match["$match"].setdefault("_id.day", {})["$ne"] = None
+    group_id = {"date": {"$dateTrunc": {"date": "$_id.day", "unit": interval, "startOfWeek": "monday"}}}
+    if by:
+        group_id["series"] = f"$_id.{by}"
+    return [
+        match,
+        {"$group": {"_id": group_id, "count": {"$sum": "$count"}}},
+        {"$sort": {"_id.date": 1, "_id.series": 1}},
+    ]
+
+
+def timeseries_response(result, interval, by):
+    """Shape the grouped buckets as {"interval", "by", "points": [{"date", "series", "count"}, ...]}."""
+    points = [{"date": b["_id"]["date"], "series": b["_id"].get("series"), "count": b["count"]} for b in result]
+    if not by:
+        for point in points:
+            del point["series"]
+    return {"interval": interval, "by": by, "points": points}
+
+
+# ---------- Sync helpers (scripts) ----------
+
+def apply_rollup(db, removed=(), added=()):
+    """Update the rollup after profiles were written."""
+    ops = rollup_ops(removed, added)
+    if ops:
+        rollup = db[ROLLUP_COLLECTION]
+        rollup.bulk_write(ops, ordered=False)
+        if removed:
+            rollup.delete_many(EMPTY_BUCKETS)
+
+
+def rebuild(db):
+    """Stamp article dates onto undated profiles, then recompute the whole rollup."""
+    profiles = db[PROFILES_COLLECTION]
+    profiles.aggregate([
+        {"$match": {PUBLISHED_AT_FIELD: {"$exists": False}}},
+        {"$lookup": {
+            "from": "articles", "localField": PROFILE_URL_FIELD, "foreignField": "URL",
+            "pipeline": [{"$project": {PUBLISHED_AT_FIELD: 1}}], "as": "article",
+        }},
+        {"$project": {PUBLISHED_AT_FIELD: {"$first": f"$article.{PUBLISHED_AT_FIELD}"}}},
+        {"$match": {PUBLISHED_AT_FIELD: {"$ne": None}}},
+        {"$merge": {"into": PROFILES_COLLECTION, "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ])
+    # Same bucket as bucket_key(): explicit nulls for missing fields
+    label = {"$arrayElemAt": [{"$getField": {
+        "field": "captures", "input": {"$regexFind": {"input": "$sent_analysis", "regex": _SENTIMENT_LABEL.pattern}},
+    }}, 0]}
+    profiles.aggregate([
+        {"$group": {
+            "_id": {
+                "day": {"$dateTrunc": {"date": f"${PUBLISHED_AT_FIELD}", "unit": "day"}},
+                "category": {"$ifNull": ["$category", None]},
+                "country": {"$ifNull": ["$country", None]},
+                "sentiment": {"$switch": {"branches": [
+                    {"case": {"$eq": [{"$type": "$sent_analysis"}, "string"]}, "then": {"$ifNull": [label, None]}},
+                    {"case": {"$eq": [{"$type": "$sent_analysis"}, "object"]}, "then": {"$ifNull": ["$sent_analysis.label", None]}},
+                ], "default": None}},
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$out": ROLLUP_COLLECTION},
+    ])
+    bump(db, PROFILES_COLLECTION)
+    print(f"{db[ROLLUP_COLLECTION].estimated_document_count()} buckets from {profiles.estimated_document_count()} profiles")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        from db import db
+        rebuild(db)
+    else:
+        print(__doc__)
+        sys.exit(1)
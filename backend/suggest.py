@@ -0,0 +1,162 @@
+"""
+In-memory prefix index of company names for /companies/suggest.
+
+Names are folded (lowercase, accents stripped) and kept in a sorted list,
+with one entry per word start, so "libre" finds "Mercado Libre" and "sao"
+finds "São Paulo Tech". A lookup bisects to the range of matching keys and
+keeps the k names with the most documents: O(log n + m log k) for m matches.
+Short prefixes match much of the index, so prefixes with more than
+SUGGEST_CACHE_MIN_MATCHES matches keep their top MAX_SUGGEST_LIMIT names
+until a count under them changes.
+
+The API loads it from the companies collection on first use and rebuilds it
+every SUGGEST_REFRESH_SECONDS to pick up writes made by other processes;
+writes through crud.py/async_crud.py update it immediately. Writes made while
+a rebuild reads and sorts the names are replayed onto the new index, so none
+is lost; one that the read already saw counts twice until the next rebuild.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+import unicodedata
+
+COMPANY_NAME_FIELD = "Empresa protagonista (Nombre)"
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+SUGGEST_REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", 300))
+SUGGEST_CACHE_MIN_MATCHES = 100
+
+
+def fold(text):
+    """Lowercase `text`, strip accents and collapse whitespace."""
+    if not text.isascii():
+        text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def _keys(name):
+    """Folded `name`, and its folded suffixes starting at each later word."""
+    folded = fold(name)
+    words = []
+    i = folded.find(" ")
+    while i != -1:
+        words.append(folded[i + 1:])
+        i = folded.find(" ", i + 1)
+    return folded, words
+
+
+def _matches(entries, prefix):
+    """Names of the sorted (key, name) entries whose key starts with prefix."""
+    start = bisect.bisect_left(entries, (prefix,))
+    end = bisect.bisect_left(entries, (prefix + "\U0010ffff",), start)
+    return (entries[i][1] for i in range(start, end))
+
+
+class PrefixIndex:
+    """Sorted (folded key, name) pairs for whole names and for later words, with a document count per name."""
+
+    def __init__(self):
+        # (names, words, counts, top names per busy prefix), replaced as a whole by
+        # build() so a lookup never mixes an old and a new index; build() may run in a thread.
+        self._state = ([], [], {}, {})
+        self.built_at = None
+        self._lock = threading.Lock()  # serializes add() with build() swapping in a new state
+        self._pending = None  # (name, delta) changes made since begin_build()
+
+    def __len__(self):
+        return len(self._state[2])
+
+    def begin_build(self):
+        """Start recording changes, to replay onto the index that the next build() makes; call before reading the names."""
+        with self._lock:
+            self._pending = []
+
+    def build(self, name_counts):
+        """Replace the index with (name, count) pairs, plus any changes made since begin_build()."""
+        counts = {}
+        for name, count in name_counts:
+            if isinstance(name, str) and name.strip() and count > 0:
+                counts[name] = counts.get(name, 0) + count
+        names, words = [], []
+        for name in counts:
+            folded, suffixes = _keys(name)
+            names.append((folded, name))
+            words.extend((suffix, name) for suffix in suffixes)
+        names.sort()
+        words.sort()
+        state = (names, words, counts, {})
+        with self._lock:
+            for name, delta in self._pending or ():
+                self._add(state, name, delta)
+            self._state = state
+            self._pending = None
+            self.built_at = time.monotonic()
+
+    def is_stale(self, max_age=SUGGEST_REFRESH_SECONDS):
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+    def add(self, name, delta=1):
+        """Change the number of documents with `name`, inserting or dropping its entries as needed."""
+        if not isinstance(name, str) or not name.strip():
+            return
+        with self._lock:
+            self._add(self._state, name, delta)
+            if self._pending is not None:
+                self._pending.append((name, delta))
+
+    @staticmethod
+    def _add(state, name, delta):
+        names, words, counts, top = state
+        before = counts.get(name, 0)
+        after = max(0, before + delta)
+        if after:
+            counts[name] = after
+        else:
+            counts.pop(name, None)
+        if before == after:
+            return
+        folded, suffixes = _keys(name)
+        for key in [folded] + suffixes:
+            for end in range(1, len(key) + 1):
+                top.pop(key[:end], None)
+        if (before == 0) == (after == 0):
+            return
+        for entries, key in [(names, folded)] + [(words, suffix) for suffix in suffixes]:
+            if after:
+                bisect.insort(entries, (key, name))
+            else:
+                i = bisect.bisect_left(entries, (key, name))
+                if i < len(entries) and entries[i] == (key, name):
+                    del entries[i]
+
+    def apply(self, removed=(), added=()):
+        """Update counts from documents removed and added by a write; a no-op until the index is first being built."""
+        if self.built_at is None and self._pending is None:
+            return
+        for doc in removed:
+            self.add(doc.get(COMPANY_NAME_FIELD), -1)
+        for doc in added:
+            self.add(doc.get(COMPANY_NAME_FIELD), 1)
+
+    def suggest(self, prefix, limit=DEFAULT_SUGGEST_LIMIT):
+        """Return up to `limit` {"name", "count"} whose name, or a word in it, starts with `prefix`.
+
+        The names with the most documents come first, alphabetically among equal counts.
+        """
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        names, words, counts, top = self._state
+        best = top.get(prefix)
+        if best is None or limit > len(best):
+            matches = set(_matches(names, prefix))
+            matches.update(_matches(words, prefix))
+            best = heapq.nsmallest(max(limit, MAX_SUGGEST_LIMIT), matches, key=lambda name: (-counts[name], name))
+            if len(matches) > SUGGEST_CACHE_MIN_MATCHES:
+                top[prefix] = best[:MAX_SUGGEST_LIMIT]
+        return [{"name": name, "count": counts[name]} for name in best[:limit]]
+
+
+company_names = PrefixIndex()
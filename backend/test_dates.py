@@ -0,0 +1,56 @@
+"""Publication date parsing and published_at ranges (dates.py)."""
+from datetime import datetime, timezone
+
+import pytest
+
+from dates import PUBLISHED_AT_FIELD, date_range, parse_date, with_published_at
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-03-05", datetime(2024, 3, 5)),
+    ("2024-03-05T10:30:00", datetime(2024, 3, 5, 10, 30)),
+    ("2024-03-05T10:30:00Z", datetime(2024, 3, 5, 10, 30)),
+    ("2024-03-05T10:30:00-03:00", datetime(2024, 3, 5, 13, 30)),
+    ("Tue, 05 Mar 2024 10:30:00 GMT", datetime(2024, 3, 5, 10, 30)),
+    ("Tue, 05 Mar 2024 10:30:00 +0100", datetime(2024, 3, 5, 9, 30)),
+    ("March 5, 2024", datetime(2024, 3, 5)),
+    ("Mar 5, 2024", datetime(2024, 3, 5)),
+    ("05/03/2024", datetime(2024, 3, 5)),
+    ("05-03-2024", datetime(2024, 3, 5)),
+    ("2024/03/05", datetime(2024, 3, 5)),
+    ("  2024-03-05 ", datetime(2024, 3, 5)),
+    (datetime(2024, 3, 5, 12, tzinfo=timezone.utc), datetime(2024, 3, 5, 12)),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, "", "   ", "yesterday", "2024-13-45", 20240305])
+def test_parse_date_unparseable(value):
+    assert parse_date(value) is None
+
+
+def test_date_range_includes_the_whole_last_day():
+    assert date_range("2024-03-01", "2024-03-05") == {
+        "$gte": datetime(2024, 3, 1), "$lt": datetime(2024, 3, 6)
+    }
+
+
+def test_date_range_with_a_time_is_inclusive():
+    assert date_range(date_to="2024-03-05T12:00:00") == {"$lte": datetime(2024, 3, 5, 12)}
+
+
+def test_date_range_without_bounds():
+    assert date_range() == {}
+
+
+@pytest.mark.parametrize("bounds", [("soon", None), (None, "2024-02-30")])
+def test_date_range_rejects_bad_input(bounds):
+    with pytest.raises(ValueError):
+        date_range(*bounds)
+
+
+def test_with_published_at():
+    assert with_published_at("articles", {"Fecha Publicación": "2024-03-05"})[PUBLISHED_AT_FIELD] == datetime(2024, 3, 5)
+    assert PUBLISHED_AT_FIELD not in with_published_at("articles", {"Título": "x"})
+    assert PUBLISHED_AT_FIELD not in with_published_at("unknown", {"Fecha Publicación": "2024-03-05"})
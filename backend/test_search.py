@@ -0,0 +1,104 @@
+"""Search merging, paging limits and snippet highlighting (search.py)."""
+from datetime import datetime
+
+import pytest
+
+from dates import PUBLISHED_AT_FIELD
+from search import (
+    MAX_TOTAL_LIMIT, check_page, highlight, make_snippet, merge_results, search_order, search_projection,
+    search_terms, text_query
+)
+
+
+def hit(collection, score, url=None, day=1):
+    doc = {"collection": collection, "score": score, PUBLISHED_AT_FIELD: datetime(2024, 1, day)}
+    if url:
+        doc["URL" if collection != "companies" else "URL de la fuente original"] = url
+    return doc
+
+
+def test_merge_results_orders_by_score_across_collections():
+    articles = [hit("articles", 9), hit("articles", 3)]
+    companies = [hit("companies", 7), hit("companies", 1)]
+    merged = merge_results([articles, companies])
+    assert [doc["score"] for doc in merged] == [9, 7, 3, 1]
+
+
+def test_merge_results_orders_by_date():
+    articles = [hit("articles", 1, day=5), hit("articles", 9, day=2)]
+    reports = [hit("media_reports", 5, day=4), {"collection": "media_reports", "score": 0}]
+    merged = merge_results([articles, reports], sort="date")
+    assert [doc["score"] for doc in merged] == [1, 5, 9, 0]  # undated hits last
+
+
+def test_merge_results_keeps_the_best_hit_of_a_repeated_url():
+    articles = [hit("articles", 9, url="http://a"), hit("articles", 2, url="http://b")]
+    companies = [hit("companies", 5, url="http://a"), hit("companies", 1)]
+    reports = [hit("media_reports", 4), hit("media_reports", 3)]
+    merged = merge_results([articles, companies, reports])
+    assert [(doc["collection"], doc["score"]) for doc in merged] == [
+        ("articles", 9), ("media_reports", 4), ("media_reports", 3), ("articles", 2), ("companies", 1)
+    ]
+
+
+def test_merge_results_stops_at_limit():
+    articles = [hit("articles", score) for score in range(10, 0, -1)]
+    assert len(merge_results([articles], limit=4)) == 4
+
+
+def test_check_page():
+    check_page(25, 20, 500)  # starts at hit 480
+    with pytest.raises(ValueError):
+        check_page(26, 20, 500)
+    with pytest.raises(ValueError):  # limit is capped
+        check_page(MAX_TOTAL_LIMIT // 100 + 1, 100, MAX_TOTAL_LIMIT * 2)
+
+
+def test_without_a_keyword_only_the_date_range_applies():
+    assert text_query("articles", "") == {}
+    assert text_query("articles", None, date_from="2024-01-01") == {PUBLISHED_AT_FIELD: {"$gte": datetime(2024, 1, 1)}}
+    assert search_order("", "score") == "date"
+    assert search_projection("") is None
+
+
+def test_text_query_with_a_keyword():
+    assert text_query("articles", "fintech") == {"$text": {"$search": "fintech"}}
+    assert search_order("fintech", "score") == "score"
+    assert search_projection("fintech") == {"score": {"$meta": "textScore"}}
+    with pytest.raises(ValueError):
+        text_query("articles", "fintech", date_to="yesterday")
+
+
+def test_search_terms_fold_and_skip_negations():
+    assert search_terms('Pagos "Banco Central" -cripto') == ["pagos", "banco central"]
+    assert search_terms("") == []
+
+
+def test_make_snippet_marks_terms_ignoring_case_and_accents():
+    assert make_snippet("La Economía de Chile", ["economia"]) == "La <mark>Economía</mark> de Chile"
+
+
+def test_make_snippet_escapes_html():
+    assert make_snippet("<b>pagos</b> & más", ["pagos"]) == "&lt;b&gt;<mark>pagos</mark>&lt;/b&gt; &amp; más"
+
+
+def test_make_snippet_prefers_the_longest_term():
+    assert make_snippet("banco central", ["banco", "banco central"]) == "<mark>banco central</mark>"
+
+
+def test_make_snippet_adds_ellipses_around_a_window():
+    text = "x" * 100 + " fintech " + "y" * 300
+    snippet = make_snippet(text, ["fintech"], width=60)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "<mark>fintech</mark>" in snippet
+
+
+def test_make_snippet_without_a_match():
+    assert make_snippet("nothing here", ["fintech"]) is None
+    assert make_snippet(None, ["fintech"]) is None
+    assert make_snippet("fintech", []) is None
+
+
+def test_highlight_covers_only_matching_search_fields():
+    doc = {"Título": "Fintech en Perú", "Resumen": "Sin coincidencias", "URL": "fintech"}
+    assert highlight(doc, "articles", ["fintech"]) == {"Título": "<mark>Fintech</mark> en Perú"}
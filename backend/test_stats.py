@@ -0,0 +1,70 @@
+"""Stats rollup buckets and the deltas bulk writes apply to them (stats.py, crud.bulk_changes)."""
+from datetime import datetime
+
+from crud import bulk_changes
+from dates import PUBLISHED_AT_FIELD
+from stats import PROFILES_COLLECTION, bucket_key, rollup_ops, sentiment_label
+
+OK = {"status": "ok"}
+ERROR = {"status": "error"}
+
+
+def profile(url, category="Fintech", day=1, sentiment="positive"):
+    return {
+        "site_url": url, "category": category, "country": "Chile",
+        "sent_analysis": str({"label": sentiment, "score": 0.9}), PUBLISHED_AT_FIELD: datetime(2024, 1, day, 15, 30),
+    }
+
+
+def deltas(ops):
+    """Return {bucket: count delta} from rollup_ops output."""
+    return {
+        (op._filter["_id"]["category"], op._filter["_id"]["country"], op._filter["_id"]["day"].day): op._doc["$inc"]["count"]
+        for op in ops
+    }
+
+
+def test_sentiment_label():
+    assert sentiment_label("{'label': 'negative', 'score': 0.7}") == "negative"
+    assert sentiment_label({"label": "neutral"}) == "neutral"
+    assert sentiment_label("unrated") is None
+    assert sentiment_label(None) is None
+
+
+def test_bucket_key_truncates_to_the_day():
+    assert bucket_key(profile("u")) == {
+        "day": datetime(2024, 1, 1), "category": "Fintech", "country": "Chile", "sentiment": "positive"
+    }
+    assert bucket_key({})["day"] is None
+
+
+def test_rollup_ops_nets_out_unchanged_buckets():
+    ops = rollup_ops(
+        removed=[profile("a"), profile("b", category="Salud")],
+        added=[profile("a"), profile("b", category="Agro"), profile("c", day=2)],
+    )
+    assert deltas(ops) == {("Salud", "Chile", 1): -1, ("Agro", "Chile", 1): 1, ("Fintech", "Chile", 2): 1}
+    assert all(op._upsert for op in ops)
+
+
+def test_bulk_changes_inserts_add_only_written_documents():
+    op_items = [(0, profile("a")), (1, profile("b"))]
+    assert bulk_changes(PROFILES_COLLECTION, op_items, [OK, ERROR], []) == ([], [profile("a")])
+
+
+def test_bulk_changes_counts_a_repeated_key_once():
+    before = [profile("a", category="Salud")]
+    op_items = [
+        (0, {"site_url": "a", "category": "Agro"}),
+        (1, {"site_url": "a", "category": "Fintech"}),
+        (2, profile("b")),
+        (3, {"site_url": "b", "country": "Perú"}),
+        (4, {"site_url": "c", "category": "Agro"}),
+    ]
+    removed, added = bulk_changes(PROFILES_COLLECTION, op_items, [OK, OK, OK, OK, ERROR], before, upsert=True)
+
+    assert removed == before
+    assert added == [{**profile("a"), "category": "Fintech"}, {**profile("b"), "country": "Perú"}]
+    assert deltas(rollup_ops(removed, added)) == {
+        ("Salud", "Chile", 1): -1, ("Fintech", "Chile", 1): 1, ("Fintech", "Perú", 1): 1
+    }
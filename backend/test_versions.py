@@ -0,0 +1,26 @@
+"""ETags built from collection versions (versions.py)."""
+from versions import etag_matches, make_etag
+
+
+def test_make_etag_is_weak_and_stable():
+    etag = make_etag([3, 7], "/articles/", [("limit", "50"), ("skip", "0")])
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag([3, 7], "/articles/", [("skip", "0"), ("limit", "50")])  # query order does not matter
+
+
+def test_make_etag_changes_with_versions_path_and_query():
+    etag = make_etag([3, 7], "/articles/", [("limit", "50")])
+    assert etag != make_etag([4, 7], "/articles/", [("limit", "50")])
+    assert etag != make_etag([3, 7], "/companies/", [("limit", "50")])
+    assert etag != make_etag([3, 7], "/articles/", [("limit", "20")])
+
+
+def test_etag_matches():
+    etag = make_etag([1], "/articles/", [])
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)  # weak comparison
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
@@ -0,0 +1,116 @@
+"""
+Registry of every source URL stored in articles, companies and media_reports.
+
+The known_urls collection holds one document per URL:
+
+    {"_id": url, "domain": "contxto.com", "sources": ["articles", ...], "added_at": datetime}
+
+crud.py and async_crud.py keep it current on insert, update and delete.
+To (re)build it from the source collections:
+
+    python url_registry.py rebuild
+"""
+import sys
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from pymongo import UpdateOne
+
+from search import URL_FIELDS
+from versions import bump
+
+KNOWN_URLS_COLLECTION = "known_urls"
+REBUILD_BATCH_SIZE = 1000
+
+
+def url_domain(url):
+    """Return the lowercased host of a URL without a leading www."""
+    host = urlparse(url).netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def add_source(name, url):
+    """Return (filter, update) that records `url` as present in collection `name`; use with upsert."""
+    return (
+        {"_id": url},
+        {
+            "$addToSet": {"sources": name},
+            "$setOnInsert": {"domain": url_domain(url), "added_at": datetime.now(timezone.utc)},
+        },
+    )
+
+
+def remove_source(name, url):
+    """Return (filter, update) that drops collection `name` from a URL's sources."""
+    return {"_id": url}, {"$pull": {"sources": name}}
+
+
+# A URL whose last source was removed is deleted with this filter
+EMPTY_SOURCES = {"sources": {"$size": 0}}
+
+
+# ---------- Sync helpers (scripts and scrapers) ----------
+
+def is_known_url(url):
+    """Return True if the URL is already stored in any source collection."""
+    from db import db
+    return db[KNOWN_URLS_COLLECTION].find_one({"_id": url}, {"_id": 1}) is not None
+
+
+def register_urls(db, name, urls):
+    """Record every URL in `urls` as present in collection `name`."""
+    if urls:
+        ops = [UpdateOne(*add_source(name, url), upsert=True) for url in urls]
+        db[KNOWN_URLS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+def unregister_url(db, name, url):
+    """Drop `name` from the URL's sources unless another document in that collection still has it."""
+    if not url or db[name].count_documents({URL_FIELDS[name]: url}, limit=1):
+        return
+    known = db[KNOWN_URLS_COLLECTION]
+    known.update_one(*remove_source(name, url))
+    known.delete_one({"_id": url, **EMPTY_SOURCES})
+
+
+def rebuild(db):
+    """Recompute every URL's sources from the source collections and drop URLs none of them hold."""
+    known = db[KNOWN_URLS_COLLECTION]
+    started = datetime.now(timezone.utc)
+    for name, field in URL_FIELDS.items():
+        ops = []
+        count = 0
+        for doc in db[name].find({field: {"$type": "string", "$ne": ""}}, {field: 1}).batch_size(REBUILD_BATCH_SIZE):
+            url = doc[field]
+            ops.append(UpdateOne(
+                {"_id": url},
+                {
+                    "$addToSet": {"rebuilt_sources": name},
+                    "$set": {"seen_at": started},
+                    "$setOnInsert": {"domain": url_domain(url), "added_at": started},
+                },
+                upsert=True,
+            ))
+            if len(ops) >= REBUILD_BATCH_SIZE:
+                known.bulk_write(ops, ordered=False)
+                count += len(ops)
+                ops = []
+        if ops:
+            known.bulk_write(ops, ordered=False)
+            count += len(ops)
+        print(f"{name}: {count} URLs registered")
+
+    stale = known.delete_many({"$or": [{"seen_at": {"$lt": started}}, {"seen_at": {"$exists": False}}]})
+    known.update_many({}, [{"$set": {"sources": "$rebuilt_sources"}}, {"$unset": ["rebuilt_sources", "seen_at"]}])
+    for name in URL_FIELDS:
+        bump(db, name)  # /website_links/ is versioned by its source collections
+    print(f"Removed {stale.deleted_count} URLs no longer stored anywhere")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        from db import db
+        rebuild(db)
+    else:
+        print(__doc__)
+        sys.exit(1)
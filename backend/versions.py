@@ -0,0 +1,78 @@
+"""
+Version counters for conditional GETs (ETag / If-None-Match).
+
+The collection_versions collection holds one document per data collection:
+
+    {"_id": "articles", "version": 42, "updated_at": datetime}
+
+crud.py and async_crud.py bump it on every write, and so do the scripts that
+write to a collection directly. An ETag is derived from the versions a
+response depends on plus its path and query, so an unchanged poll is
+answered from a single lookup by _id. If documents were changed some other
+way, bump their collection by hand:
+
+    python versions.py bump articles media_reports
+"""
+import hashlib
+import sys
+from contextvars import ContextVar
+
+VERSIONS_COLLECTION = "collection_versions"
+
+# Versions already read while handling the current request ({name: version}),
+# so the ETag and the response cache key come from the same read
+request_versions = ContextVar("request_versions", default=None)
+
+
+def bump_op(name):
+    """Return (filter, update) that increments collection `name`'s version; use with upsert."""
+    return {"_id": name}, {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}}
+
+
+def bump(db, name):
+    """Increment collection `name`'s version with the sync client."""
+    db[VERSIONS_COLLECTION].update_one(*bump_op(name), upsert=True)
+
+
+async def get_versions(db, names):
+    """Current version of each collection in `names`, in order; 0 if it was never bumped.
+
+    Within a request, versions read earlier (request_versions) are reused.
+    """
+    known = request_versions.get()
+    if known is not None and all(name in known for name in names):
+        return [known[name] for name in names]
+    found = {
+        doc["_id"]: doc["version"]
+        async for doc in db[VERSIONS_COLLECTION].find({"_id": {"$in": list(names)}}, {"version": 1})
+    }
+    versions = [found.get(name, 0) for name in names]
+    request_versions.set({**(known or {}), **dict(zip(names, versions))})
+    return versions
+
+
+def make_etag(versions, path, query):
+    """Weak ETag for a response at `path` with (key, value) `query` pairs, built from collection versions."""
+    key = repr((list(versions), path, sorted(query))).encode()
+    return f'W/"{hashlib.sha1(key).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Tell whether an If-None-Match header lists `etag` (compared weakly, as RFC 9110 requires for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "bump":
+        from db import db
+        for name in sys.argv[2:]:
+            bump(db, name)
+            print(f"{name}: version bumped")
+    else:
+        print(__doc__)
+        sys.exit(1)
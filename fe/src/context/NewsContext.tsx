@@ -1,6 +1,6 @@
 import React, { createContext, useState, useContext, useEffect } from 'react';
 import { Article } from '../types';
-import { fetchArticles } from '../services/api';
+import { fetchArticles, subscribeToArticles } from '../services/api';
 
 
 interface ArticleFilters {
@@ -56,6 +56,17 @@ export const NewsProvider: React.FC<{ children: React.ReactNode }> = ({ children
     // eslint-disable-next-line
   }, [filters]);
 
+  // New and updated articles arrive over SSE instead of refetching the list
+  useEffect(() => {
+    return subscribeToArticles(article => {
+      if (filters.query) {
+        const q = filters.query.toLowerCase();
+        if (!article.Título?.toLowerCase().includes(q) && !article.Resumen?.toLowerCase().includes(q)) return;
+      }
+      setArticles(prev => [article, ...prev.filter(a => a._id !== article._id)]);
+    });
+  }, [filters]);
+
   const updateFilters = (newFilters: Partial<ArticleFilters>) => {
     setFilters(prev => ({ ...prev, ...newFilters }));
   };
@@ -10,19 +10,34 @@ const NewsSearchFilter: React.FC = () => {
   const [dateFrom, setDateFrom] = useState("");
   const [dateTo, setDateTo] = useState("");
   const [results, setResults] = useState<any[]>([]);
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  // Fetch website links on mount
+  // Fetch website links on mount, following next_cursor through every page
   useEffect(() => {
-    fetch(`${API_BASE_URL}/website_links/`)
-      .then((res) => res.json())
-      .then((data) => setWebsiteOptions(data))
+    const loadWebsiteLinks = async () => {
+      const links: string[] = [];
+      let after: string | null = null;
+      do {
+        const params = new URLSearchParams({ limit: "500" });
+        if (after) params.set("after", after);
+        const res = await fetch(`${API_BASE_URL}/website_links/?${params.toString()}`);
+        if (!res.ok) throw new Error("Error fetching website links");
+        const data: { items: string[]; next_cursor: string | null } = await res.json();
+        links.push(...data.items);
+        after = data.next_cursor;
+      } while (after);
+      return links;
+    };
+    loadWebsiteLinks()
+      .then((links) => setWebsiteOptions(links))
       .catch(() => setWebsiteOptions([]));
   }, []);
 
-  const handleSubmit = async (e: React.FormEvent) => {
-    e.preventDefault();
+  // GET /search_websites/ returns one page: {items, page, page_size, has_more}
+  const runSearch = async (pageNumber: number) => {
     setLoading(true);
     setError(null);
 
@@ -31,6 +46,7 @@ const NewsSearchFilter: React.FC = () => {
     if (website) params.append("website", website);
     if (dateFrom) params.append("date_from", dateFrom);
     if (dateTo) params.append("date_to", dateTo);
+    params.append("page", String(pageNumber));
 
     try {
       const res = await fetch(
@@ -38,7 +54,9 @@ const NewsSearchFilter: React.FC = () => {
       );
       if (!res.ok) throw new Error("Error fetching search results");
       const data = await res.json();
-      setResults(data);
+      setResults(data.items);
+      setPage(data.page);
+      setHasMore(data.has_more);
     } catch (err: any) {
       setError(err.message || "Unknown error");
     } finally {
@@ -46,6 +64,11 @@ const NewsSearchFilter: React.FC = () => {
     }
   };
 
+  const handleSubmit = (e: React.FormEvent) => {
+    e.preventDefault();
+    runSearch(1);
+  };
+
   const websiteOptionsFormatted = websiteOptions.map((link) => ({
     value: link,
     label: link,
@@ -165,6 +188,27 @@ const NewsSearchFilter: React.FC = () => {
             </tbody>
           </table>
         )}
+        {(page > 1 || hasMore) && (
+          <div className="flex justify-between items-center mt-4">
+            <button
+              type="button"
+              onClick={() => runSearch(page - 1)}
+              disabled={loading || page <= 1}
+              className="px-3 py-1 border border-slate-300 rounded text-sm disabled:opacity-50"
+            >
+              Anterior
+            </button>
+            <span className="text-sm text-slate-500">Página {page}</span>
+            <button
+              type="button"
+              onClick={() => runSearch(page + 1)}
+              disabled={loading || !hasMore}
+              className="px-3 py-1 border border-slate-300 rounded text-sm disabled:opacity-50"
+            >
+              Siguiente
+            </button>
+          </div>
+        )}
         {!loading && results.length === 0 && (
           <div className="text-slate-500 text-center mt-8">
             No hay resultados.
@@ -37,7 +37,7 @@ const Settings: React.FC = () => {
       const result = await response.json();
       console.log("Spider triggered:", result);
       setStatusMessage(
-        `Spider run triggered.\nKeywords: "${keyword}"\nURLs: ${urlsArray.join(
+        `${result.duplicate ? "Spider run already in progress" : "Spider run queued"} (job ${result.job_id}).\nKeywords: "${keyword}"\nURLs: ${urlsArray.join(
           ", "
         )}\nFrequency: ${frequency}\nRun Time: ${runTime}`
       );
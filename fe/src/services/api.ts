@@ -92,13 +92,65 @@ import { Article, Company, MediaReport } from '../types';
 const API_BASE_URL = 'http://localhost:8000';
 
 /**
- * Fetch all articles from the backend.
+ * Largest page the list endpoints accept (MAX_PAGE_SIZE in the backend).
+ */
+const PAGE_SIZE = 500;
+
+/**
+ * One page of a list endpoint; pass next_cursor as `after` for the next one.
+ */
+interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+/**
+ * Fetch every item of a paginated list endpoint, following next_cursor.
+ *
+ * TEMPORARY SHIM: this still downloads whole collections to the client, so
+ * server-side pagination saves nothing here yet. Views that list a
+ * collection (NewsContext, the Articles/Companies/MediaReports tables)
+ * should request one page at a time and load more on demand. Do not use it
+ * in new code.
+ */
+const fetchAllPages = async <T>(
+  path: string,
+  errorMessage: string,
+  params: Record<string, string> = {}
+): Promise<T[]> => {
+  const items: T[] = [];
+  let after: string | null = null;
+  do {
+    const query = new URLSearchParams({ ...params, limit: String(PAGE_SIZE) });
+    if (after) query.set('after', after);
+    const res = await fetch(`${API_BASE_URL}${path}?${query.toString()}`);
+    if (!res.ok) throw new Error(errorMessage);
+    const page: Page<T> = await res.json();
+    items.push(...page.items);
+    after = page.next_cursor;
+  } while (after);
+  return items;
+};
+
+/**
+ * Fetch all articles from the backend, page by page.
  * GET /articles/
  */
 export const fetchArticles = async (): Promise<Article[]> => {
-  const res = await fetch(`${API_BASE_URL}/articles/`);
-  if (!res.ok) throw new Error('Failed to fetch articles');
-  return res.json();
+  return fetchAllPages<Article>('/articles/', 'Failed to fetch articles');
+};
+
+/**
+ * Subscribe to newly inserted or updated articles.
+ * GET /stream/articles (server-sent events)
+ * Returns a function that closes the stream.
+ */
+export const subscribeToArticles = (onArticle: (article: Article) => void): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/stream/articles?collection=articles`);
+  source.addEventListener('article', (event) => {
+    onArticle(JSON.parse((event as MessageEvent).data));
+  });
+  return () => source.close();
 };
 
 /**
@@ -116,19 +168,15 @@ export const fetchArticleById = async (articleId: string): Promise<Article> => {
  * GET /articles/?empresa={companyName}
  */
 export const fetchArticlesByEmpresa = async (empresa: string): Promise<Article[]> => {
-  const res = await fetch(`${API_BASE_URL}/articles/?empresa=${encodeURIComponent(empresa)}`);
-  if (!res.ok) throw new Error('Failed to fetch articles by empresa');
-  return res.json();
+  return fetchAllPages<Article>('/articles/', 'Failed to fetch articles by empresa', { empresa });
 };
 
 /**
- * Fetch all companies from the backend.
+ * Fetch all companies from the backend, page by page.
  * GET /companies/
  */
 export const fetchCompanies = async (): Promise<Company[]> => {
-  const res = await fetch(`${API_BASE_URL}/companies/`);
-  if (!res.ok) throw new Error('Failed to fetch companies');
-  return res.json();
+  return fetchAllPages<Company>('/companies/', 'Failed to fetch companies');
 };
 
 /**
@@ -146,19 +194,15 @@ export const fetchCompanyById = async (companyId: string): Promise<Company> => {
  * GET /companies/?empresa={companyName}
  */
 export const fetchCompaniesByEmpresa = async (empresa: string): Promise<Company[]> => {
-  const res = await fetch(`${API_BASE_URL}/companies/?empresa=${encodeURIComponent(empresa)}`);
-  if (!res.ok) throw new Error('Failed to fetch companies by empresa');
-  return res.json();
+  return fetchAllPages<Company>('/companies/', 'Failed to fetch companies by empresa', { empresa });
 };
 
 /**
- * Fetch all media reports from the backend.
+ * Fetch all media reports from the backend, page by page.
  * GET /media_reports/
  */
 export const fetchMediaReports = async (): Promise<MediaReport[]> => {
-  const res = await fetch(`${API_BASE_URL}/media_reports/`);
-  if (!res.ok) throw new Error('Failed to fetch media reports');
-  return res.json();
+  return fetchAllPages<MediaReport>('/media_reports/', 'Failed to fetch media reports');
 };
 
 /**
@@ -176,7 +220,5 @@ export const fetchMediaReportById = async (mediaReportId: string): Promise<Media
  * GET /media_reports/?empresa={companyName}
  */
 export const fetchMediaReportsByEmpresa = async (empresa: string): Promise<MediaReport[]> => {
-  const res = await fetch(`${API_BASE_URL}/media_reports/?empresa=${encodeURIComponent(empresa)}`);
-  if (!res.ok) throw new Error('Failed to fetch media reports by empresa');
-  return res.json();
+  return fetchAllPages<MediaReport>('/media_reports/', 'Failed to fetch media reports by empresa', { empresa });
 };